@@ -1,15 +1,22 @@
+import time
+_startup_begin = time.time()
+
 import logging
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from config import Config
 from services.translation_service import TranslationService
+from services.job_service import JobManager
+from services.long_audio import LongAudioProcessor
 from routes.api import api_bp
+from routes.debug import debug_bp
 from socket_handlers.handlers import register_socket_handlers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+startup_timings = {'imports': round(time.time() - _startup_begin, 3)}
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
@@ -26,11 +33,18 @@ socketio = SocketIO(
     max_http_buffer_size=10000000  # 10MB for large audio files
 )
 
-# Initialize translation service
+# Initialize translation service (models load in the background)
+service_start = time.time()
 translation_service = TranslationService()
+startup_timings['translation_service'] = round(time.time() - service_start, 3)
+job_manager = JobManager(translation_service)
+app.translation_service = translation_service
+app.job_manager = job_manager
+app.long_audio_processor = LongAudioProcessor(translation_service)
 
 # Register blueprints
 app.register_blueprint(api_bp)
+app.register_blueprint(debug_bp)
 
 # Register socket handlers
 register_socket_handlers(socketio, translation_service)
@@ -43,10 +57,17 @@ def index():
 # Store active rooms and users (shared state)
 active_rooms = {}
 user_languages = {}
+user_codecs = {}
+user_delivery = {}
 
 # Make shared state available to modules
 app.active_rooms = active_rooms
 app.user_languages = user_languages
+app.user_codecs = user_codecs
+app.user_delivery = user_delivery
+
+startup_timings['total'] = round(time.time() - _startup_begin, 3)
+logger.info(f"App startup breakdown (seconds): {startup_timings}")
 
 if __name__ == "__main__":
     logger.info("Starting translation server...")
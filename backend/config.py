@@ -1,4 +1,5 @@
 import os
+import json
 import secrets
 from dotenv import load_dotenv
 
@@ -27,6 +28,60 @@ class Config:
     # Model settings
     WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'small')
     
+    # Startup settings
+    STARTUP_TIMEOUT = float(os.getenv('STARTUP_TIMEOUT', 300))  # max wait for backends, seconds
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_LANGUAGES = tuple(os.getenv('WARMUP_LANGUAGES', 'en,ru').split(',')[:2])
+    
+    # Worker pool and batch job settings
+    TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', 4))
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 3600))
+    MAX_JOB_FILES = int(os.getenv('MAX_JOB_FILES', 50))
+    
+    # Load-adaptive quality tiers (QUALITY_TIERS is an optional JSON list of tier dicts)
+    QUALITY_ADAPTIVE_ENABLED = os.getenv('QUALITY_ADAPTIVE_ENABLED', 'True').lower() == 'true'
+    QUALITY_TIERS = json.loads(os.getenv('QUALITY_TIERS', 'null'))
+    QUALITY_QUEUE_HIGH = int(os.getenv('QUALITY_QUEUE_HIGH', 8))  # pending live utterances
+    QUALITY_QUEUE_LOW = int(os.getenv('QUALITY_QUEUE_LOW', 2))
+    QUALITY_LATENCY_HIGH = float(os.getenv('QUALITY_LATENCY_HIGH', 3.0))  # seconds queued before a worker starts
+    QUALITY_LATENCY_LOW = float(os.getenv('QUALITY_LATENCY_LOW', 0.5))
+    QUALITY_COOLDOWN = float(os.getenv('QUALITY_COOLDOWN', 15.0))  # seconds between tier changes
+    
+    # Transcript cache and duplicate upload suppression
+    TRANSCRIPT_CACHE_SIZE = int(os.getenv('TRANSCRIPT_CACHE_SIZE', 512))
+    DUPLICATE_WINDOW_SECONDS = float(os.getenv('DUPLICATE_WINDOW_SECONDS', 10))
+    
+    # Long-form audio settings
+    LONG_AUDIO_CHUNK_MS = int(os.getenv('LONG_AUDIO_CHUNK_MS', 30000))
+    LONG_AUDIO_OVERLAP_MS = int(os.getenv('LONG_AUDIO_OVERLAP_MS', 1000))
+    LONG_AUDIO_SILENCE_THRESH = int(os.getenv('LONG_AUDIO_SILENCE_THRESH', -40))  # dBFS
+    
+    # Translation routing settings
+    TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', 10))
+    TRANSLATION_HEDGE_ENABLED = os.getenv('TRANSLATION_HEDGE_ENABLED', 'False').lower() == 'true'
+    TRANSLATION_HEDGE_MIN_DELAY = float(os.getenv('TRANSLATION_HEDGE_MIN_DELAY', 0.3))  # seconds
+    
+    # Sentence-level pipelining of translation and TTS within an utterance
+    SENTENCE_PIPELINING_ENABLED = os.getenv('SENTENCE_PIPELINING_ENABLED', 'True').lower() == 'true'
+    SEGMENT_WORKERS = int(os.getenv('SEGMENT_WORKERS', 8))
+    SEGMENT_MIN_CHARS = int(os.getenv('SEGMENT_MIN_CHARS', 20))  # shorter fragments join the next sentence
+    SEGMENT_MAX_IN_FLIGHT = int(os.getenv('SEGMENT_MAX_IN_FLIGHT', 3))  # per utterance, across languages
+    
+    # Seconds a listener's later results wait for a missing earlier utterance before it is skipped
+    REORDER_MAX_WAIT = float(os.getenv('REORDER_MAX_WAIT', 8.0))
+    
+    # Max seconds a coalesced translate/TTS call waits on the in-flight request
+    COALESCE_TIMEOUT = float(os.getenv('COALESCE_TIMEOUT', 30))
+    
+    # Admin/debug settings (debug endpoints are disabled without ADMIN_TOKEN)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds
+    PROFILE_MAX_TASKS = int(os.getenv('PROFILE_MAX_TASKS', 10))  # per arming request
+    
+    # Output codecs offered to clients, most preferred first
+    TTS_CODEC_PREFERENCE = [c.strip() for c in os.getenv('TTS_CODEC_PREFERENCE', 'opus,mp3,aac').split(',') if c.strip()]
+    
     # TTS Voice mapping
     VOICE_MAP = {
         'uz': 'uz-UZ-MadinaNeural',  # Uzbek voice
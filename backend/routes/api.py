@@ -1,30 +1,26 @@
 import os
+import json
 import tempfile
 import io
 import logging
-from flask import Blueprint, request, send_file, jsonify, current_app
-from services.translation_service import TranslationService
+from flask import Blueprint, Response, request, send_file, jsonify, current_app
 
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 api_bp = Blueprint('api', __name__)
 
-# Initialize translation service (will be shared across requests)
-translation_service = None
-
-@api_bp.before_app_request
-def initialize_translation_service():
-    global translation_service
-    translation_service = TranslationService()
+def _save_upload(upload):
+    """Save an uploaded audio file to a temp file and return its path"""
+    suffix = os.path.splitext(upload.filename or "")[1] or ".wav"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_in:
+        upload.save(tmp_in.name)
+        return tmp_in.name
 
 @api_bp.route("/translate", methods=["POST"])
 def translate_audio():
     """Legacy REST API endpoint for backward compatibility"""
-    global translation_service
-    
-    if not translation_service:
-        translation_service = TranslationService()
+    translation_service = current_app.translation_service
     
     if 'audio' not in request.files:
         return jsonify({"error": "No audio file uploaded"}), 400
@@ -34,10 +30,8 @@ def translate_audio():
 
     audio_file = request.files['audio']
 
-    # Save temp WAV file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_in:
-        audio_path = tmp_in.name
-        audio_file.save(audio_path)
+    # Save temp audio file
+    audio_path = _save_upload(audio_file)
 
     try:
         # Transcribe
@@ -59,16 +53,117 @@ def translate_audio():
         if os.path.exists(audio_path):
             os.remove(audio_path)
 
+@api_bp.route("/translate/long", methods=["POST"])
+def translate_long_audio():
+    """Long-form transcription/translation: split at silence, process segments in parallel"""
+    if 'audio' not in request.files:
+        return jsonify({"error": "No audio file uploaded"}), 400
+
+    lang_from = request.form.get("lang_from", "en")
+    lang_to = request.form.get("lang_to") or None
+    stream = request.form.get("stream", "false").lower() == "true"
+    processor = current_app.long_audio_processor
+    audio_path = _save_upload(request.files['audio'])
+
+    if not stream:
+        # Don't hold a web thread for the whole recording; run it as a job to poll
+        job = current_app.job_manager.submit_long_job(
+            request.files['audio'].filename or "audio", audio_path, lang_from, lang_to, processor
+        )
+        response = job.to_dict()
+        response['status_url'] = f"/jobs/{job.id}"
+        response['stream_url'] = f"/jobs/{job.id}/stream"
+        return jsonify(response), 202
+
+    def generate():
+        # One JSON object per line, in segment order
+        try:
+            for segment in processor.iter_segments(audio_path, lang_from, lang_to):
+                yield json.dumps(segment) + "\n"
+        finally:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+
+    return Response(generate(), mimetype="application/x-ndjson",
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route("/jobs", methods=["POST"])
+def submit_job():
+    """Submit one or many audio files for translation into one or many languages"""
+    uploads = request.files.getlist('audio')
+    if not uploads:
+        return jsonify({"error": "No audio file uploaded"}), 400
+    if len(uploads) > current_app.config['MAX_JOB_FILES']:
+        return jsonify({"error": f"Too many files (max {current_app.config['MAX_JOB_FILES']})"}), 400
+
+    lang_from = request.form.get("lang_from", "en")
+    # Accept repeated lang_to fields or a comma-separated list
+    targets = []
+    for value in request.form.getlist("lang_to") or ["ru"]:
+        targets.extend(lang.strip() for lang in value.split(",") if lang.strip())
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        return jsonify({"error": "No target language given"}), 400
+
+    files = [(upload.filename or f"audio_{i}", _save_upload(upload)) for i, upload in enumerate(uploads)]
+    job = current_app.job_manager.submit_job(files, lang_from, targets)
+
+    response = job.to_dict()
+    response['status_url'] = f"/jobs/{job.id}"
+    response['stream_url'] = f"/jobs/{job.id}/stream"
+    return jsonify(response), 202
+
+@api_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Poll a job's status and per-item results"""
+    job = current_app.job_manager.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@api_bp.route("/jobs/<job_id>/items/<int:index>/audio", methods=["GET"])
+def get_job_item_audio(job_id, index):
+    """Download the synthesized audio for one job item"""
+    job = current_app.job_manager.get_job(job_id)
+    if not job or index not in job.audio:
+        return jsonify({'error': 'Audio not found'}), 404
+    return send_file(io.BytesIO(job.audio[index]), mimetype="audio/mpeg",
+                     as_attachment=True, download_name=f"translated_{index}.mp3")
+
+@api_bp.route("/jobs/<job_id>/stream", methods=["GET"])
+def stream_job(job_id):
+    """Stream per-item results as server-sent events while the job runs"""
+    job_manager = current_app.job_manager
+    job = job_manager.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    include_audio = request.args.get('include_audio', 'false').lower() == 'true'
+
+    def generate():
+        for item in job_manager.iter_results(job, include_audio=include_audio):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: item\ndata: {json.dumps(item)}\n\n"
+        yield f"event: done\ndata: {json.dumps(job.to_dict(include_items=False))}\n\n"
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
         active_rooms = getattr(current_app, 'active_rooms', {})
+        translation_service = getattr(current_app, 'translation_service', None)
+        init_errors = dict(translation_service.init_errors) if translation_service else {}
         return jsonify({
-            'status': 'healthy',
+            'status': 'unhealthy' if init_errors else 'healthy',
+            'ready': bool(translation_service and translation_service.ready),
+            'init_error': init_errors or None,
             'active_rooms': len(active_rooms),
             'total_users': sum(len(users) for users in active_rooms.values())
-        })
+        }), 503 if init_errors else 200
     except Exception as e:
         logger.error(f"Health check error: {e}")
         return jsonify({
@@ -76,6 +171,15 @@ def health_check():
             'error': str(e)
         }), 500
 
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Service metrics: queue, workers, providers, caches and quality tier changes"""
+    try:
+        return jsonify(current_app.translation_service.get_status())
+    except Exception as e:
+        logger.error(f"Metrics error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/rooms', methods=['GET'])
 def get_rooms():
     """Get list of active rooms"""
@@ -0,0 +1,65 @@
+import hmac
+import logging
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, current_app
+from config import Config
+from utils.profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+debug_bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+sampling_profiler = SamplingProfiler(interval=Config.PROFILE_SAMPLE_INTERVAL)
+
+def admin_required(view):
+    """Allow access only with the configured admin token; disabled when no token is set"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Header only: query strings end up in access and proxy logs
+        token = request.headers.get('X-Admin-Token', '')
+        if not Config.ADMIN_TOKEN or not hmac.compare_digest(token, Config.ADMIN_TOKEN):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@debug_bp.route('/profile', methods=['GET'])
+@admin_required
+def profile():
+    """Sample all threads for N seconds and return collapsed stacks for flamegraph tools"""
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({'error': 'seconds must be a number'}), 400
+    seconds = max(0.1, min(seconds, Config.PROFILE_MAX_SECONDS))
+
+    logger.info(f"Sampling profiler running for {seconds:.1f}s")
+    collapsed = sampling_profiler.sample(seconds)
+    if collapsed is None:
+        return jsonify({'error': 'A profile is already running'}), 409
+    return Response(collapsed, mimetype='text/plain')
+
+@debug_bp.route('/profile/tasks', methods=['GET'])
+@admin_required
+def task_profiles():
+    """cProfile reports of recent profiled utterances (process-wide on Python 3.12+)"""
+    store = current_app.translation_service.task_profiles
+    return jsonify({'armed': store.get_armed(), 'profiles': store.list()})
+
+@debug_bp.route('/profile/tasks', methods=['POST'])
+@admin_required
+def arm_task_profiles():
+    """Profile the next N utterances of a room: {"room_id": ..., "count": N}"""
+    data = request.get_json(silent=True) or {}
+    room_id = data.get('room_id')
+    if not room_id:
+        return jsonify({'error': 'room_id is required'}), 400
+    try:
+        count = int(data.get('count', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count must be an integer'}), 400
+    count = max(0, min(count, Config.PROFILE_MAX_TASKS))
+
+    current_app.translation_service.task_profiles.arm(room_id, count)
+    logger.info(f"Task profiling armed for {count} utterance(s) in room {room_id}")
+    return jsonify({'room_id': room_id, 'count': count})
@@ -0,0 +1,205 @@
+import os
+import time
+import uuid
+import base64
+import logging
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+from config import Config
+from services.translation_service import PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationJob:
+    """A batch of audio files translated into one or more target languages"""
+
+    def __init__(self, files: List[Tuple[str, str]], lang_from: str, targets: List[str]):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.finished_at = None
+        self.lang_from = lang_from
+        self.targets = targets
+        self.files = files  # (filename, temp path)
+        self.items = [
+            {
+                'index': file_index * len(targets) + target_index,
+                'file': filename,
+                'lang_to': lang_to,
+                'status': 'queued',
+                'text': None,
+                'translated_text': None,
+                'error': None
+            }
+            for file_index, (filename, _) in enumerate(files)
+            for target_index, lang_to in enumerate(targets)
+        ]
+        self.audio = {}  # item index -> synthesized audio bytes
+        self.completed = []  # item indexes in completion order, for streaming
+        self.condition = threading.Condition()
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is not None:
+            return 'completed'
+        if any(item['status'] != 'queued' for item in self.items):
+            return 'running'
+        return 'queued'
+
+    def item_index(self, file_index: int, target_index: int) -> int:
+        return file_index * len(self.targets) + target_index
+
+    def to_dict(self, include_items: bool = True) -> Dict[str, Any]:
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'lang_from': self.lang_from,
+            'targets': self.targets,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'total_items': len(self.items),
+            'completed_items': len(self.completed)
+        }
+        if include_items:
+            data['items'] = [dict(item) for item in self.items]
+        return data
+
+
+class JobManager:
+    """Run batch translation jobs on the shared worker pool at batch priority"""
+
+    def __init__(self, translation_service):
+        self.translation_service = translation_service
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit_job(self, files: List[Tuple[str, str]], lang_from: str, targets: List[str]) -> TranslationJob:
+        """Queue every file for transcription; translations fan out once the transcript is ready"""
+        self._prune_jobs()
+        job = TranslationJob(files, lang_from, targets)
+        with self.lock:
+            self.jobs[job.id] = job
+
+        for file_index in range(len(files)):
+            self.translation_service.submit(self._process_file, job, file_index, priority=PRIORITY_BATCH)
+
+        logger.info(f"Job {job.id} queued: {len(files)} file(s) -> {targets}")
+        return job
+
+    def submit_long_job(self, filename: str, audio_path: str, lang_from: str,
+                        lang_to: Optional[str], processor) -> TranslationJob:
+        """Queue one long recording for segmented processing by a LongAudioProcessor
+
+        It runs on its own thread rather than the worker pool: it waits on
+        segment futures queued to that pool, which a pool worker must not do.
+        """
+        self._prune_jobs()
+        job = TranslationJob([(filename, audio_path)], lang_from, [lang_to])
+        with self.lock:
+            self.jobs[job.id] = job
+
+        threading.Thread(
+            target=self._process_long, args=(job, processor, lang_to),
+            daemon=True, name=f"LongAudioJob-{job.id[:8]}"
+        ).start()
+
+        logger.info(f"Long-audio job {job.id} queued: {filename} -> {lang_to}")
+        return job
+
+    def _process_long(self, job: TranslationJob, processor, lang_to: Optional[str]):
+        """Transcribe (and translate) a long recording segment by segment"""
+        filename, audio_path = job.files[0]
+        self._update_item(job, 0, status='transcribing')
+        try:
+            result = processor.process(audio_path, job.lang_from, lang_to)
+            self._finish_item(job, 0, status='completed', text=result['text'],
+                              translated_text=result.get('translated_text'),
+                              segments=result['segments'])
+        except Exception as e:
+            logger.error(f"Long-audio job {job.id} failed: {e}")
+            self._finish_item(job, 0, status='failed', error=str(e))
+        finally:
+            self.translation_service._cleanup_temp_file(audio_path)
+
+    def get_job(self, job_id: str) -> Optional[TranslationJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _process_file(self, job: TranslationJob, file_index: int):
+        """Transcribe one file once, then queue one translation item per target language"""
+        filename, audio_path = job.files[file_index]
+        for target_index in range(len(job.targets)):
+            self._update_item(job, job.item_index(file_index, target_index), status='transcribing')
+
+        try:
+            text = self.translation_service.transcribe_audio(audio_path, language=job.lang_from)
+        finally:
+            self.translation_service._cleanup_temp_file(audio_path)
+
+        if not text:
+            for target_index in range(len(job.targets)):
+                self._finish_item(job, job.item_index(file_index, target_index),
+                                  status='failed', error='No speech transcribed')
+            return
+
+        for target_index, lang_to in enumerate(job.targets):
+            index = job.item_index(file_index, target_index)
+            self._update_item(job, index, status='translating', text=text)
+            self.translation_service.submit(self._process_item, job, index, text, lang_to,
+                                            priority=PRIORITY_BATCH)
+
+    def _process_item(self, job: TranslationJob, index: int, text: str, lang_to: str):
+        """Translate and synthesize one (file, target language) item"""
+        try:
+            translated = self.translation_service.translate_text(text, job.lang_from, lang_to)
+            audio_bytes = self.translation_service.text_to_speech(translated, lang_to)
+            if not audio_bytes:
+                self._finish_item(job, index, status='failed', translated_text=translated,
+                                  error='Speech synthesis failed')
+                return
+            job.audio[index] = audio_bytes
+            self._finish_item(job, index, status='completed', translated_text=translated)
+        except Exception as e:
+            logger.error(f"Job {job.id} item {index} failed: {e}")
+            self._finish_item(job, index, status='failed', error=str(e))
+
+    def _update_item(self, job: TranslationJob, index: int, **fields):
+        with job.condition:
+            job.items[index].update(fields)
+
+    def _finish_item(self, job: TranslationJob, index: int, **fields):
+        with job.condition:
+            job.items[index].update(fields)
+            job.completed.append(index)
+            if len(job.completed) == len(job.items):
+                job.finished_at = time.time()
+                logger.info(f"Job {job.id} finished in {job.finished_at - job.created_at:.2f}s")
+            job.condition.notify_all()
+
+    def iter_results(self, job: TranslationJob, timeout: float = 15.0, include_audio: bool = False):
+        """Yield finished items in completion order; yields None as a keep-alive while waiting"""
+        cursor = 0
+        while True:
+            with job.condition:
+                if cursor >= len(job.completed) and job.finished_at is None:
+                    job.condition.wait(timeout)
+                ready = job.completed[cursor:]
+                finished = job.finished_at is not None
+            if not ready and not finished:
+                yield None
+            for index in ready:
+                item = dict(job.items[index])
+                if include_audio and index in job.audio:
+                    item['audio'] = base64.b64encode(job.audio[index]).decode('utf-8')
+                yield item
+            cursor += len(ready)
+            if finished and cursor >= len(job.items):
+                return
+
+    def _prune_jobs(self):
+        """Drop finished jobs older than the retention window"""
+        cutoff = time.time() - Config.JOB_RETENTION_SECONDS
+        with self.lock:
+            for job_id, job in list(self.jobs.items()):
+                if job.finished_at is not None and job.finished_at < cutoff:
+                    del self.jobs[job_id]
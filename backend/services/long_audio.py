@@ -0,0 +1,124 @@
+import re
+import shutil
+import logging
+import tempfile
+from concurrent.futures import wait
+from typing import Optional, Dict, Any, List, Iterator
+from config import Config
+from services.translation_service import PRIORITY_BATCH
+from utils.audio_utils import split_audio_on_silence, save_audio_chunks
+
+logger = logging.getLogger(__name__)
+
+# Longest run of words we expect to be repeated across an overlap
+MAX_OVERLAP_WORDS = 15
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def strip_overlap(previous: str, current: str, max_words: int = MAX_OVERLAP_WORDS) -> str:
+    """Remove words at the start of current that repeat the end of previous"""
+    prev_words = [_normalize_word(w) for w in previous.split()]
+    curr_words = current.split()
+    curr_norm = [_normalize_word(w) for w in curr_words]
+
+    for size in range(min(max_words, len(prev_words), len(curr_words)), 0, -1):
+        if prev_words[-size:] == curr_norm[:size]:
+            return " ".join(curr_words[size:])
+    return current
+
+
+class LongAudioProcessor:
+    """Split long recordings at silence and transcribe/translate segments in parallel"""
+
+    def __init__(self, translation_service):
+        self.translation_service = translation_service
+
+    def _transcribe_segment(self, segment_path: str, lang_from: str) -> str:
+        return self.translation_service.transcribe_audio(segment_path, language=lang_from)
+
+    def iter_segments(self, audio_path: str, lang_from: str,
+                      lang_to: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield segment results in order as soon as each one (and all before it) is ready"""
+        segments = split_audio_on_silence(
+            audio_path,
+            chunk_duration_ms=Config.LONG_AUDIO_CHUNK_MS,
+            overlap_ms=Config.LONG_AUDIO_OVERLAP_MS,
+            silence_thresh=Config.LONG_AUDIO_SILENCE_THRESH
+        )
+        if not segments:
+            return
+
+        work_dir = tempfile.mkdtemp(prefix="long_audio_")
+        transcriptions = []
+        translations = []
+        try:
+            # Segments are already mono 16 kHz, well under the ASR upload limit
+            chunk_paths = save_audio_chunks([chunk for _, _, chunk in segments], work_dir)
+            logger.info(f"Long-form audio split into {len(chunk_paths)} segments")
+
+            transcriptions = [
+                self.translation_service.submit(self._transcribe_segment, path, lang_from,
+                                                priority=PRIORITY_BATCH)
+                for path in chunk_paths
+            ]
+
+            previous_text = ""
+            next_to_yield = 0
+            for index, future in enumerate(transcriptions):
+                raw_text = future.result() or ""
+                text = strip_overlap(previous_text, raw_text) if index else raw_text
+                previous_text = raw_text
+
+                start_ms, end_ms, _ = segments[index]
+                result = {
+                    'index': index,
+                    'start': start_ms / 1000.0,
+                    'end': end_ms / 1000.0,
+                    'text': text
+                }
+                if lang_to and text:
+                    translations.append((result, self.translation_service.submit(
+                        self.translation_service.translate_text, text, lang_from, lang_to,
+                        priority=PRIORITY_BATCH
+                    )))
+                else:
+                    translations.append((result, None))
+
+                # Flush every leading result that is already complete
+                while next_to_yield < len(translations):
+                    pending_result, pending = translations[next_to_yield]
+                    if pending is not None and not pending.done():
+                        break
+                    yield self._finish(pending_result, pending, lang_to)
+                    next_to_yield += 1
+
+            for pending_result, pending in translations[next_to_yield:]:
+                yield self._finish(pending_result, pending, lang_to)
+        finally:
+            # On early exit (e.g. a streaming client went away) drop queued work, and let
+            # segments already running finish before their files are removed
+            futures = transcriptions + [pending for _, pending in translations if pending is not None]
+            running = [future for future in futures if not future.cancel()]
+            if any(not future.done() for future in running):
+                wait(running)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def _finish(result: Dict[str, Any], pending, lang_to: Optional[str]) -> Dict[str, Any]:
+        if lang_to:
+            result['translated_text'] = pending.result() if pending is not None else ""
+        return result
+
+    def process(self, audio_path: str, lang_from: str, lang_to: Optional[str] = None) -> Dict[str, Any]:
+        """Process a whole recording and return the stitched transcript and per-segment results"""
+        segments = list(self.iter_segments(audio_path, lang_from, lang_to))
+        result = {
+            'segments': segments,
+            'text': " ".join(s['text'] for s in segments if s['text'])
+        }
+        if lang_to:
+            result['translated_text'] = " ".join(s['translated_text'] for s in segments if s['translated_text'])
+        return result
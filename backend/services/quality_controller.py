@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable
+
+logger = logging.getLogger(__name__)
+
+# Whisper checkpoints from cheapest to most expensive; '.en' variants follow the same ladder
+WHISPER_SIZES = ['tiny', 'base', 'small', 'medium', 'large']
+
+
+def smaller_whisper_model(model: str) -> Optional[str]:
+    """The next Whisper size down from model (keeping '.en'), or None if there is none"""
+    name, english = (model[:-3], '.en') if model.endswith('.en') else (model, '')
+    size = 'large' if name == 'turbo' else name.split('-')[0]  # large-v3, large-v3-turbo
+    if size not in WHISPER_SIZES or size == WHISPER_SIZES[0]:
+        return None
+    smaller = WHISPER_SIZES[WHISPER_SIZES.index(size) - 1]
+    return smaller + english
+
+
+def default_quality_tiers(whisper_model: str, use_gpu: bool) -> List[Dict[str, Any]]:
+    """Quality tiers ordered from best to cheapest, for the active speech mode
+
+    Only local Whisper has decoding and model-size knobs; the OpenAI API tiers
+    would all be identical, so API mode goes straight from full to text-only.
+    Tiers that change nothing over the previous one are left out, so each step
+    down actually sheds load.
+    """
+    base = {'whisper_model': whisper_model, 'greedy': False,
+            'asr_api_model': 'whisper-1', 'tts_model': 'tts-1', 'text_only': False}
+    candidates = [dict(base, name='full')]
+    if use_gpu:
+        candidates.append(dict(base, name='greedy', greedy=True))
+        smaller = smaller_whisper_model(whisper_model)
+        if smaller:
+            candidates.append(dict(base, name='small_model', greedy=True, whisper_model=smaller))
+    candidates.append(dict(candidates[-1], name='text_only', text_only=True))
+
+    tiers = []
+    for tier in candidates:
+        settings = {key: value for key, value in tier.items() if key != 'name'}
+        if tiers and settings == {key: value for key, value in tiers[-1].items() if key != 'name'}:
+            continue
+        tiers.append(tier)
+    return tiers
+
+
+def load_quality_tiers(configured: Any, whisper_model: str, use_gpu: bool) -> List[Dict[str, Any]]:
+    """Validate configured tiers, filling unset settings from the full tier
+
+    Falls back to default_quality_tiers when nothing is configured or the
+    configuration is not a non-empty list of dicts that each have a name.
+    """
+    defaults = default_quality_tiers(whisper_model, use_gpu)
+    if configured is None:
+        return defaults
+    if not isinstance(configured, list) or not configured or not all(
+            isinstance(tier, dict) and isinstance(tier.get('name'), str) and tier['name']
+            for tier in configured):
+        logger.error(f"Invalid QUALITY_TIERS {configured!r}, expected a non-empty list of "
+                     f"objects with a name; using the defaults")
+        return defaults
+    return [dict(defaults[0], **tier) for tier in configured]
+
+
+class QualityController:
+    """Step down through quality tiers under load and back up when it drops
+
+    Load is the live queue depth plus the moving average of load_stage, by
+    default how long utterances waited in the queue before a worker picked
+    them up. Unlike end-to-end time, queue wait doesn't grow with utterance
+    length, so one long monologue on an idle server doesn't look like load.
+    """
+
+    def __init__(self, tiers: List[Dict[str, Any]], queue_depth: Callable[[], int],
+                 queue_high: int = 8, queue_low: int = 2,
+                 latency_high: float = 3.0, latency_low: float = 0.5,
+                 cooldown: float = 15.0, enabled: bool = True, alpha: float = 0.3,
+                 load_stage: str = 'queue_wait'):
+        self.tiers = tiers
+        self.queue_depth = queue_depth
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.latency_high = latency_high
+        self.latency_low = latency_low
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self.alpha = alpha
+        self.load_stage = load_stage
+
+        self.tier_index = 0
+        self.last_change = 0.0
+        self.stage_latency = {}  # stage -> EWMA seconds
+        self.tier_changes = 0
+        self.history = deque(maxlen=50)
+        self.lock = threading.Lock()
+
+    @property
+    def tier(self) -> Dict[str, Any]:
+        return self.tiers[self.tier_index]
+
+    def record_latency(self, stage: str, seconds: float):
+        """Feed a stage latency sample (e.g. 'queue_wait', 'transcribe', 'tts', 'total')"""
+        with self.lock:
+            previous = self.stage_latency.get(stage)
+            self.stage_latency[stage] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def evaluate(self) -> Dict[str, Any]:
+        """Re-check load, possibly change tier, and return the tier to use now"""
+        if not self.enabled or len(self.tiers) < 2:
+            return self.tier
+
+        depth = self.queue_depth()
+        with self.lock:
+            latency = self.stage_latency.get(self.load_stage, 0.0)
+            if time.time() - self.last_change < self.cooldown:
+                return self.tier
+
+            if (depth >= self.queue_high or latency >= self.latency_high) and self.tier_index < len(self.tiers) - 1:
+                self._change_tier(self.tier_index + 1, f"queue={depth}, {self.load_stage}={latency:.2f}s")
+            elif depth <= self.queue_low and latency <= self.latency_low and self.tier_index > 0:
+                self._change_tier(self.tier_index - 1, f"queue={depth}, {self.load_stage}={latency:.2f}s")
+            return self.tier
+
+    def _change_tier(self, new_index: int, reason: str):
+        old_name = self.tier['name']
+        self.tier_index = new_index
+        self.last_change = time.time()
+        self.tier_changes += 1
+        self.history.append({
+            'time': self.last_change,
+            'from': old_name,
+            'to': self.tier['name'],
+            'reason': reason
+        })
+        logger.warning(f"Quality tier changed {old_name} -> {self.tier['name']} ({reason})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'tier': self.tier['name'],
+                'tier_index': self.tier_index,
+                'tier_changes': self.tier_changes,
+                'load_stage': self.load_stage,
+                'stage_latency': {stage: round(value, 3) for stage, value in self.stage_latency.items()},
+                'history': list(self.history)
+            }
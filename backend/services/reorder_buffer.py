@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class _ListenerStream:
+    """Ordering state for one listener and one speaker stream"""
+
+    def __init__(self):
+        self.expected = deque()  # seqs still owed to this listener, in order
+        self.pending = {}        # seq -> sends held back until seq reaches the head
+        self.finished = set()    # seqs whose final send (or skip) has arrived
+        self.timer = None
+        self.progress = time.monotonic()  # last time the head item sent something or advanced
+        self.closed = False
+        self.lock = threading.Lock()
+
+
+class ReorderBuffer:
+    """Release each listener's results in per-speaker sequence order
+
+    Sequence numbers are assigned per stream (e.g. room and speaker) at
+    ingestion, together with the listeners owed a result. Results that arrive
+    ahead of an earlier item are held back; if the head item makes no progress
+    for max_wait seconds while later ones wait behind it, it is skipped. An item
+    may be delivered in several parts: it is complete once a final part (or a
+    skip) arrives, and each part resets the head's wait. Parts arriving after
+    their item was skipped are sent with send(late=True), so the caller can
+    strip anything (like audio) that must not play out of order.
+    """
+
+    def __init__(self, max_wait: float = 8.0):
+        self.max_wait = max_wait
+        self.sequences = {}  # stream -> next seq
+        self.listeners = {}  # listener_id -> {stream: _ListenerStream}
+        self.released = 0
+        self.held = 0
+        self.skipped = 0
+        self.late = 0
+        # Held for the whole of register() so expected queues fill in seq order
+        self.register_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+    def register(self, stream: Hashable, listener_ids: Iterable[str]) -> int:
+        """Assign the next sequence number in stream and expect it from each listener"""
+        with self.register_lock:
+            with self.lock:
+                seq = self.sequences.get(stream, 0)
+                self.sequences[stream] = seq + 1
+            for listener_id in listener_ids:
+                while True:
+                    with self.lock:
+                        state = self.listeners.setdefault(listener_id, {}).setdefault(stream, _ListenerStream())
+                    with state.lock:
+                        # A state emptied and forgotten meanwhile is replaced by a fresh one
+                        if not state.closed:
+                            state.expected.append(seq)
+                            break
+            return seq
+
+    def _state(self, listener_id: str, stream: Hashable):
+        with self.lock:
+            return self.listeners.get(listener_id, {}).get(stream)
+
+    def deliver(self, listener_id: str, stream: Hashable, seq: int,
+                send: Callable[..., Any], final: bool = True):
+        """Send now if seq is next for this listener, otherwise hold it back"""
+        state = self._state(listener_id, stream)
+        if state is None:
+            # Nothing left to order against: the item was skipped and the stream drained
+            self._send_late(listener_id, seq, send)
+            return
+        with state.lock:
+            if seq not in state.expected or seq in state.finished:
+                # Already skipped; the text is still worth showing
+                self._send_late(listener_id, seq, send)
+                return
+            state.pending.setdefault(seq, []).append(send)
+            if final:
+                state.finished.add(seq)
+            if seq != state.expected[0]:
+                with self.lock:
+                    self.held += 1
+            self._flush(listener_id, stream, state)
+
+    def _send_late(self, listener_id: str, seq: int, send: Callable[..., Any]):
+        with self.lock:
+            self.late += 1
+        logger.info(f"Late result seq={seq} for {listener_id}, delivering out of order")
+        send(late=True)
+
+    def skip(self, listener_id: str, stream: Hashable, seq: int):
+        """Mark seq as complete for this listener (failed, cancelled or nothing to send)"""
+        state = self._state(listener_id, stream)
+        if state is None:
+            return
+        with state.lock:
+            if seq not in state.expected:
+                return
+            state.finished.add(seq)
+            self._flush(listener_id, stream, state)
+
+    def _flush(self, listener_id: str, stream: Hashable, state: _ListenerStream):
+        """Release everything now in order; called with state.lock held"""
+        released = 0
+        while state.expected:
+            head = state.expected[0]
+            for send in state.pending.pop(head, []):
+                send()
+                released += 1
+                state.progress = time.monotonic()
+            if head not in state.finished:
+                break
+            state.finished.discard(head)
+            state.expected.popleft()
+            state.progress = time.monotonic()
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+        with self.lock:
+            self.released += released
+
+        if not state.expected:
+            self._forget(listener_id, stream, state)
+        elif state.timer is None and (state.pending or state.finished):
+            # Later items are waiting on the head; give it max_wait to show progress
+            self._arm_timer(listener_id, stream, state, self.max_wait)
+
+    def _arm_timer(self, listener_id: str, stream: Hashable, state: _ListenerStream, delay: float):
+        state.timer = threading.Timer(delay, self._on_timeout, (listener_id, stream, state.expected[0]))
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _on_timeout(self, listener_id: str, stream: Hashable, seq: int):
+        state = self._state(listener_id, stream)
+        if state is None:
+            return
+        with state.lock:
+            if not state.expected or state.expected[0] != seq:
+                return
+            state.timer = None
+            idle = time.monotonic() - state.progress
+            if idle < self.max_wait:
+                # The head is still streaming parts; only skip it once it goes quiet
+                self._arm_timer(listener_id, stream, state, self.max_wait - idle)
+                return
+            logger.warning(f"Skipping seq={seq} for {listener_id} after {self.max_wait}s wait")
+            with self.lock:
+                self.skipped += 1
+            state.expected.popleft()
+            state.pending.pop(seq, None)
+            state.finished.discard(seq)
+            self._flush(listener_id, stream, state)
+
+    def _forget(self, listener_id: str, stream: Hashable, state: _ListenerStream):
+        state.closed = True
+        with self.lock:
+            streams = self.listeners.get(listener_id)
+            if streams is not None and streams.get(stream) is state:
+                del streams[stream]
+                if not streams:
+                    del self.listeners[listener_id]
+
+    def drop_participant(self, user_id: str):
+        """Forget a disconnected user, both as listener and as speaker"""
+        with self.lock:
+            streams = self.listeners.pop(user_id, {})
+            for stream in [s for s in self.sequences if isinstance(s, tuple) and user_id in s]:
+                del self.sequences[stream]
+        for state in streams.values():
+            with state.lock:
+                state.closed = True
+                if state.timer is not None:
+                    state.timer.cancel()
+                    state.timer = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'listeners': len(self.listeners),
+                'streams': len(self.sequences),
+                'released': self.released,
+                'held': self.held,
+                'skipped': self.skipped,
+                'late': self.late
+            }
@@ -0,0 +1,107 @@
+import time
+import uuid
+import logging
+import threading
+from typing import Optional, Dict, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task once nobody is waiting for its result"""
+
+
+class TaskHandle:
+    """Cancellation state for one queued utterance and the recipients still waiting on it"""
+
+    def __init__(self, room_id: str, recipient_ids: Iterable[str]):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.room_id = room_id
+        self.recipients = set(recipient_ids)
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def is_active(self, user_id: str) -> bool:
+        with self.lock:
+            return user_id in self.recipients and not self.cancelled
+
+    def remove_recipient(self, user_id: str) -> bool:
+        """Drop a recipient; returns True if that left the task with nobody to deliver to"""
+        with self.lock:
+            self.recipients.discard(user_id)
+            return not self.recipients
+
+    def cancel(self):
+        """Stop the task: drop it from the queue if pending, otherwise signal the running worker"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        if self.cancelled:
+            raise TaskCancelled(self.id)
+
+
+class TaskRegistry:
+    """Track in-flight live tasks by room and recipient so they can be cancelled"""
+
+    def __init__(self):
+        self.rooms = {}  # room_id -> set of TaskHandle
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def register(self, handle: TaskHandle):
+        with self.lock:
+            self.rooms.setdefault(handle.room_id, set()).add(handle)
+
+    def unregister(self, handle: TaskHandle):
+        with self.lock:
+            handles = self.rooms.get(handle.room_id)
+            if handles is not None:
+                handles.discard(handle)
+                if not handles:
+                    del self.rooms[handle.room_id]
+
+    def _handles(self, room_id: Optional[str] = None):
+        with self.lock:
+            if room_id is not None:
+                return list(self.rooms.get(room_id, ()))
+            return [handle for handles in self.rooms.values() for handle in handles]
+
+    def cancel_recipient(self, user_id: str, room_id: Optional[str] = None) -> int:
+        """Remove a recipient from pending work (in one room or all); cancel tasks left with no one"""
+        count = 0
+        for handle in self._handles(room_id):
+            if handle.remove_recipient(user_id):
+                handle.cancel()
+                count += 1
+        with self.lock:
+            self.cancelled += count
+        if count:
+            logger.info(f"Cancelled {count} task(s) after {user_id} left")
+        return count
+
+    def cancel_room(self, room_id: str) -> int:
+        """Cancel every pending or running task for a room"""
+        handles = self._handles(room_id)
+        for handle in handles:
+            handle.cancel()
+        with self.lock:
+            self.cancelled += len(handles)
+        if handles:
+            logger.info(f"Cancelled {len(handles)} task(s) for closed room {room_id}")
+        return len(handles)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'in_flight': sum(len(handles) for handles in self.rooms.values()),
+                'rooms': len(self.rooms),
+                'cancelled': self.cancelled
+            }
@@ -0,0 +1,80 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Hashable, Tuple
+
+
+def hash_audio(audio) -> str:
+    """SHA-256 of encoded audio, from bytes or a file path"""
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray)):
+        digest.update(audio)
+    else:
+        with open(audio, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """Bounded LRU cache from (audio hash, source language, ASR settings) to transcript
+
+    The ASR settings (model and decoding options) are part of the key so a
+    cheap transcript made under load is never served once quality recovers.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, audio_hash: str, language: str, asr: Hashable = None) -> Optional[str]:
+        key = (audio_hash, language, asr)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def put(self, audio_hash: str, language: str, text: str, asr: Hashable = None):
+        if self.max_entries <= 0:
+            return
+        key = (audio_hash, language, asr)
+        with self.lock:
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class DuplicateFilter:
+    """Remember recent submissions so retries of the same payload can be dropped"""
+
+    def __init__(self, window_seconds: float = 10.0):
+        self.window_seconds = window_seconds
+        self.seen = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def check(self, key: Tuple) -> bool:
+        """Record key and return True if it was already seen inside the window"""
+        now = time.time()
+        with self.lock:
+            # Expire old entries so the map stays small
+            for old_key, seen_at in list(self.seen.items()):
+                if now - seen_at > self.window_seconds:
+                    del self.seen[old_key]
+            if key in self.seen:
+                self.dropped += 1
+                return True
+            self.seen[key] = now
+            return False
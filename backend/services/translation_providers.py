@@ -0,0 +1,352 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List, Iterable
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationError(Exception):
+    """Raised when no translation provider could handle a request"""
+
+
+class TranslationProvider:
+    """Base class for a text translation backend with declared language coverage"""
+
+    name = "base"
+
+    # Languages this backend can translate from/to; None means "try anything"
+    source_languages: Optional[Iterable[str]] = None
+    target_languages: Optional[Iterable[str]] = None
+
+    def supports(self, lang_from: str, lang_to: str) -> bool:
+        """Check whether this backend declares coverage for a language pair"""
+        if self.source_languages is not None and lang_from not in self.source_languages:
+            return False
+        if self.target_languages is not None and lang_to not in self.target_languages:
+            return False
+        return True
+
+    def is_ready(self, lang_from: str, lang_to: str) -> bool:
+        """Whether the pair can be served right now (e.g. its model is loaded)"""
+        return True
+
+    def prepare(self, lang_from: str, lang_to: str):
+        """Start making a covered pair ready; called only when nothing else can serve it"""
+
+    def translate(self, text: str, lang_from: str, lang_to: str) -> str:
+        """Translate text, raising on any failure"""
+        raise NotImplementedError
+
+
+class DeepLProvider(TranslationProvider):
+    """DeepL API backend"""
+
+    name = "deepl"
+    source_languages = {
+        'ar', 'bg', 'cs', 'da', 'de', 'el', 'en', 'es', 'et', 'fi', 'fr', 'hu', 'id',
+        'it', 'ja', 'ko', 'lt', 'lv', 'nb', 'nl', 'pl', 'pt', 'ro', 'ru', 'sk', 'sl',
+        'sv', 'tr', 'uk', 'zh'
+    }
+    target_languages = source_languages
+
+    # DeepL requires a regional variant for some target languages
+    TARGET_VARIANTS = {'en': 'EN-US', 'pt': 'PT-BR'}
+
+    def __init__(self, token: str):
+        import deepl
+        self.translator = deepl.Translator(token)
+
+    def translate(self, text: str, lang_from: str, lang_to: str) -> str:
+        result = self.translator.translate_text(
+            text=text,
+            source_lang=lang_from.upper(),
+            target_lang=self.TARGET_VARIANTS.get(lang_to, lang_to.upper())
+        )
+        return result.text
+
+
+class TilmochProvider(TranslationProvider):
+    """Tilmoch (tahrirchi.uz) backend, used for Uzbek pairs"""
+
+    name = "tilmoch"
+    API_URL = "https://websocket.tahrirchi.uz/translate-v2"
+
+    # Tilmoch uses NLLB-style language codes
+    LANGUAGE_CODES = {
+        'uz': 'uzn_Latn',
+        'en': 'eng_Latn',
+        'ru': 'rus_Cyrl',
+        'kaa': 'kaa_Latn',
+    }
+    source_languages = set(LANGUAGE_CODES)
+    target_languages = source_languages
+
+    def __init__(self, token: str, timeout: float = 10.0):
+        self.token = token
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": self.token
+        })
+
+    def supports(self, lang_from: str, lang_to: str) -> bool:
+        # Only route pairs that involve Uzbek (or Karakalpak) here
+        if 'uz' not in (lang_from, lang_to) and 'kaa' not in (lang_from, lang_to):
+            return False
+        return super().supports(lang_from, lang_to)
+
+    def translate(self, text: str, lang_from: str, lang_to: str) -> str:
+        response = self.session.post(self.API_URL, json={
+            "text": text,
+            "source_lang": self.LANGUAGE_CODES[lang_from],
+            "target_lang": self.LANGUAGE_CODES[lang_to]
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        translated = response.json().get("translated_text")
+        if not translated:
+            raise TranslationError("Tilmoch returned an empty translation")
+        return translated
+
+
+class MarianProvider(TranslationProvider):
+    """Local HuggingFace Marian (Helsinki-NLP opus-mt) backend
+
+    A pair's model loads in a background thread once the router finds no
+    other healthy provider for it. Until it is ready the pair isn't routed
+    here, so the router never waits on a download and load time never lands
+    in the latency stats.
+    """
+
+    name = "marian"
+
+    def __init__(self, device: int = -1):
+        self.device = device
+        self.translators = {}
+        self.missing_models = set()
+        self.loading = set()
+        self._lock = threading.Lock()
+
+    def supports(self, lang_from: str, lang_to: str) -> bool:
+        return self._model_name(lang_from, lang_to) not in self.missing_models
+
+    def is_ready(self, lang_from: str, lang_to: str) -> bool:
+        return self._model_name(lang_from, lang_to) in self.translators
+
+    def prepare(self, lang_from: str, lang_to: str):
+        self.preload(lang_from, lang_to)
+
+    @staticmethod
+    def _model_name(lang_from: str, lang_to: str) -> str:
+        return f"Helsinki-NLP/opus-mt-{lang_from}-{lang_to}"
+
+    def preload(self, lang_from: str, lang_to: str):
+        """Start loading a pair's model in the background, once per model"""
+        model_name = self._model_name(lang_from, lang_to)
+        with self._lock:
+            if model_name in self.translators or model_name in self.loading or model_name in self.missing_models:
+                return
+            self.loading.add(model_name)
+        threading.Thread(
+            target=self._load, args=(model_name,), daemon=True, name=f"MarianLoad-{lang_from}-{lang_to}"
+        ).start()
+
+    def _load(self, model_name: str):
+        load_start = time.time()
+        try:
+            # Deferred so transformers/torch are only imported when first needed
+            from transformers import pipeline
+            self.translators[model_name] = pipeline("translation", model=model_name, device=self.device)
+            logger.info(f"Loaded {model_name} in {time.time() - load_start:.1f}s")
+        except Exception as e:
+            # Don't route this pair here again
+            self.missing_models.add(model_name)
+            logger.warning(f"Marian model {model_name} unavailable: {e}")
+        finally:
+            with self._lock:
+                self.loading.discard(model_name)
+
+    def translate(self, text: str, lang_from: str, lang_to: str) -> str:
+        translator = self.translators.get(self._model_name(lang_from, lang_to))
+        if translator is None:
+            raise TranslationError(f"Marian model for {lang_from} -> {lang_to} is not loaded yet")
+        result = translator(text)
+        return result[0]['translation_text']
+
+
+class ProviderStats:
+    """Moving latency and error score for one provider
+
+    Only the provider actually called gets new samples, so the averages decay
+    back toward the prior with decay_half_life: a provider that was slow or
+    failed once is tried again once the one in use looks no better than it.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 100, initial_latency: float = 1.0,
+                 decay_half_life: float = 60.0):
+        self.alpha = alpha
+        self.prior_latency = initial_latency
+        self.decay_half_life = decay_half_life
+        self.updated_at = time.time()
+        self.latency_ewma = initial_latency
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def _decay(self, now: float):
+        """Pull the averages toward the prior for the time since the last update; call with lock held"""
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / self.decay_half_life)
+        self.latency_ewma = self.prior_latency + (self.latency_ewma - self.prior_latency) * factor
+        self.error_rate *= factor
+        self.updated_at = now
+
+    def record(self, latency: float, success: bool, failure_threshold: int, cooldown: float):
+        with self.lock:
+            self._decay(time.time())
+            self.calls += 1
+            self.samples.append(latency)
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+            self.error_rate += self.alpha * ((0.0 if success else 1.0) - self.error_rate)
+            if success:
+                self.consecutive_failures = 0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= failure_threshold:
+                    self.open_until = time.time() + cooldown
+
+    def healthy(self) -> bool:
+        return time.time() >= self.open_until
+
+    def score(self) -> float:
+        # Lower is better; errors make a provider look slower
+        with self.lock:
+            self._decay(time.time())
+            return self.latency_ewma * (1.0 + 4.0 * self.error_rate)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self.lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            self._decay(time.time())
+        return {
+            'latency_ewma': round(self.latency_ewma, 4),
+            'latency_p95': self.percentile(95),
+            'error_rate': round(self.error_rate, 4),
+            'calls': self.calls,
+            'failures': self.failures,
+            'healthy': self.healthy()
+        }
+
+
+class TranslationRouter:
+    """Route each language pair to the fastest healthy provider, with optional hedging"""
+
+    def __init__(self, providers: List[TranslationProvider], hedge_enabled: bool = False,
+                 hedge_min_delay: float = 0.3, failure_threshold: int = 3,
+                 cooldown: float = 30.0, max_workers: int = 8):
+        self.providers = list(providers)
+        self.stats = {provider.name: ProviderStats() for provider in self.providers}
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="TranslationHedge")
+
+    def has_provider(self, name: str) -> bool:
+        return any(provider.name == name for provider in self.providers)
+
+    def candidates(self, lang_from: str, lang_to: str) -> List[TranslationProvider]:
+        """Ready providers covering the pair, healthy ones first, fastest first"""
+        covering = [p for p in self.providers if p.supports(lang_from, lang_to)]
+        ready = [p for p in covering if p.is_ready(lang_from, lang_to)]
+        if not any(self.stats[p.name].healthy() for p in ready):
+            # Nothing healthy can serve the pair; start loading the providers that could
+            for provider in covering:
+                if provider not in ready:
+                    provider.prepare(lang_from, lang_to)
+        # sorted() is stable, so registration order breaks ties
+        return sorted(ready, key=lambda p: (not self.stats[p.name].healthy(), self.stats[p.name].score()))
+
+    def _call(self, provider: TranslationProvider, text: str, lang_from: str, lang_to: str) -> str:
+        start = time.time()
+        try:
+            result = provider.translate(text, lang_from, lang_to)
+        except Exception:
+            self.stats[provider.name].record(time.time() - start, False, self.failure_threshold, self.cooldown)
+            raise
+        self.stats[provider.name].record(time.time() - start, True, self.failure_threshold, self.cooldown)
+        return result
+
+    def _hedge_delay(self, provider: TranslationProvider) -> float:
+        p95 = self.stats[provider.name].percentile(95)
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.hedge_min_delay)
+
+    def translate(self, text: str, lang_from: str, lang_to: str) -> str:
+        """Translate text, raising TranslationError if every candidate fails"""
+        candidates = self.candidates(lang_from, lang_to)
+        if not candidates:
+            raise TranslationError(f"No translation provider for {lang_from} -> {lang_to}")
+
+        last_error = None
+        remaining = list(candidates)
+        while remaining:
+            primary = remaining.pop(0)
+            if not self.hedge_enabled or not remaining:
+                try:
+                    return self._call(primary, text, lang_from, lang_to)
+                except Exception as e:
+                    logger.warning(f"Provider {primary.name} failed for {lang_from} -> {lang_to}: {e}")
+                    last_error = e
+                    continue
+
+            # Hedged request: give the primary its p95, then race a second provider
+            futures = {self.executor.submit(self._call, primary, text, lang_from, lang_to): primary}
+            done, _ = wait(futures, timeout=self._hedge_delay(primary))
+            if not done:
+                secondary = remaining.pop(0)
+                self.hedged_requests += 1
+                logger.info(f"Hedging {primary.name} with {secondary.name} for {lang_from} -> {lang_to}")
+                futures[self.executor.submit(self._call, secondary, text, lang_from, lang_to)] = secondary
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"Provider {futures[future].name} failed for {lang_from} -> {lang_to}: {e}")
+                        last_error = e
+                        continue
+                    if futures[future] is not primary:
+                        self.hedge_wins += 1
+                    # The slower call keeps running and still feeds its latency stats
+                    return result
+
+        raise TranslationError(f"All providers failed for {lang_from} -> {lang_to}: {last_error}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'providers': {name: stats.to_dict() for name, stats in self.stats.items()},
+            'hedge_enabled': self.hedge_enabled,
+            'hedged_requests': self.hedged_requests,
+            'hedge_wins': self.hedge_wins
+        }
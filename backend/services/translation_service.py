@@ -1,62 +1,210 @@
 import os
 import asyncio
-import deepl
 import base64
 import threading
 import queue
+import itertools
+import importlib
+import importlib.util
 import logging
 import tempfile
 import time
-import requests
+import wave
 from pathlib import Path
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Optional, Dict, Any, Tuple
 from config import Config
-from openai import OpenAI, AsyncOpenAI
-import io
-from pydub import AudioSegment
+from services.translation_providers import (
+    TranslationRouter, DeepLProvider, TilmochProvider, MarianProvider
+)
+from services.quality_controller import QualityController, load_quality_tiers
+from services.task_registry import TaskRegistry, TaskHandle, TaskCancelled
+from services.reorder_buffer import ReorderBuffer
+from services.transcript_cache import TranscriptCache, DuplicateFilter, hash_audio
+from utils.profiler import TaskProfileStore
+from utils.single_flight import SingleFlight
+from utils.text_utils import split_sentences
+from utils.audio_utils import (
+    AUDIO_CODECS, DEFAULT_CODEC, detect_audio_codec, transcode_audio, prepare_audio_for_asr
+)
 
-# Try importing GPU dependencies
-try:
-    import whisper
-    import torch
-    from transformers import pipeline
-    import edge_tts
-    GPU_AVAILABLE = True
-except ImportError:
-    GPU_AVAILABLE = False
+# Check for local model dependencies without importing them; the heavy
+# backends are only imported once the configured mode needs them
+GPU_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None
+    for module in ('whisper', 'torch', 'transformers', 'edge_tts')
+)
 
 logger = logging.getLogger(__name__)
 logging.info(f"Using GPU: {GPU_AVAILABLE}")
 
+# Worker pool priorities (lower runs first)
+PRIORITY_LIVE = 0
+PRIORITY_BATCH = 10
+
+# Listener delivery modes
+DELIVERY_AUDIO = 'audio'        # translated audio + text
+DELIVERY_TEXT = 'text'          # translated text only, no TTS
+DELIVERY_ORIGINAL = 'original'  # original transcript only, no translation
+DELIVERY_MODES = (DELIVERY_AUDIO, DELIVERY_TEXT, DELIVERY_ORIGINAL)
+
+# Output codecs each TTS provider can return directly
+OPENAI_TTS_FORMATS = ['mp3', 'opus', 'aac', 'flac', 'wav']
+EDGE_TTS_FORMATS = ['mp3']
+
 class TranslationService:
     """Enhanced translation service with better error handling and optimization"""
     
     def __init__(self):
         self.use_gpu = Config.USE_GPU if hasattr(Config, 'USE_GPU') else False
         self.use_gpu = self.use_gpu and GPU_AVAILABLE
+        self.router = None
+        self.startup_timings = {}
+        self.ready_event = threading.Event()
+        self.init_errors = {}  # startup stage -> error message
+        
+        # Content-hash transcript cache and retry suppression
+        self.transcript_cache = TranscriptCache(Config.TRANSCRIPT_CACHE_SIZE)
+        self.duplicate_filter = DuplicateFilter(Config.DUPLICATE_WINDOW_SECONDS)
+        
+        # Concurrent identical translate/TTS calls share one provider request
+        self.translate_flight = SingleFlight(Config.COALESCE_TIMEOUT)
+        self.tts_flight = SingleFlight(Config.COALESCE_TIMEOUT)
+        
+        # Per-sentence translate/TTS runs here, not on the worker pool, so a
+        # worker waiting on its segments can never starve them
+        self.segment_executor = ThreadPoolExecutor(
+            max_workers=Config.SEGMENT_WORKERS, thread_name_prefix="Segment"
+        )
+        
+        # cProfile reports for utterances submitted with profiling on
+        self.task_profiles = TaskProfileStore()
         
-        # Initialize speech processing
-        self._init_speech_service()
+        # Live tasks by room and recipient, for cancellation on leave/disconnect
+        self.task_registry = TaskRegistry()
         
-        # Initialize text translation
-        self._init_translation_service()
+        # Per-speaker sequence numbers and per-listener in-order release
+        self.reorder = ReorderBuffer(Config.REORDER_MAX_WAIT)
         
-        # Setup audio processing queue
+        # Load-adaptive quality tiers, driven by pending live utterances and latency
+        self._live_pending = 0
+        self._live_pending_lock = threading.Lock()
+        self.quality = QualityController(
+            load_quality_tiers(Config.QUALITY_TIERS, Config.WHISPER_MODEL, self.use_gpu),
+            queue_depth=lambda: self._live_pending,
+            queue_high=Config.QUALITY_QUEUE_HIGH,
+            queue_low=Config.QUALITY_QUEUE_LOW,
+            latency_high=Config.QUALITY_LATENCY_HIGH,
+            latency_low=Config.QUALITY_LATENCY_LOW,
+            cooldown=Config.QUALITY_COOLDOWN,
+            enabled=Config.QUALITY_ADAPTIVE_ENABLED
+        )
+        
+        # Setup audio processing queue; workers wait until the backends are ready
         self._init_audio_queue()
         
-        logger.info(f"Translation service initialized (GPU: {self.use_gpu})")
+        # Load models and clients in the background so the server can bind right away
+        self.init_thread = threading.Thread(
+            target=self._init_backends,
+            daemon=True,
+            name="TranslationServiceInit"
+        )
+        self.init_thread.start()
+        
+        logger.info(f"Translation service created (GPU: {self.use_gpu}), loading backends in background")
+    
+    def _timed(self, stage: str, func, *args):
+        """Run one startup stage and record how long it took"""
+        stage_start = time.time()
+        try:
+            return func(*args)
+        finally:
+            self.startup_timings[stage] = round(time.time() - stage_start, 3)
+    
+    def _init_backends(self):
+        """Import and initialize speech and translation backends, then warm them up"""
+        init_start = time.time()
+        try:
+            # Speech and translation come up independently so one failing doesn't hide the other
+            for stage, init in (('speech_service', self._init_speech_service),
+                                ('translation_service', self._init_translation_service)):
+                try:
+                    self._timed(stage, init)
+                except Exception as e:
+                    self.init_errors[stage] = str(e)
+                    logger.error(f"Translation service initialization failed ({stage}): {e}")
+        finally:
+            # Unblock workers even on failure; /health reports the stages that failed
+            self.startup_timings['ready'] = round(time.time() - init_start, 3)
+            self.ready_event.set()
+        
+        logger.info(f"Translation service ready (GPU: {self.use_gpu}), startup breakdown: {self.startup_timings}")
+        
+        # Load lower tiers' Whisper models now, not when overload first selects them
+        if self.use_gpu and hasattr(self, 'speech_models'):
+            for tier in self.quality.tiers:
+                if tier.get('whisper_model'):
+                    self._get_speech_model(tier['whisper_model'])
+        
+        if Config.WARMUP_ENABLED:
+            self._warmup()
+            logger.info(f"Warmup finished, startup breakdown: {self.startup_timings}")
+    
+    def _warmup(self):
+        """Run a tiny dummy utterance through each stage to prime models and connections"""
+        warmup_path = None
+        try:
+            # Half a second of 16 kHz mono silence
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+                warmup_path = tmp_file.name
+            with wave.open(warmup_path, 'wb') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(16000)
+                wav_file.writeframes(b"\x00\x00" * 8000)
+            
+            lang_from, lang_to = Config.WARMUP_LANGUAGES
+            self._timed('warmup_transcribe', self._transcribe_audio, warmup_path, lang_from)
+            self._timed('warmup_translate', self._translate_text, "Hello", lang_from, lang_to)
+            self._timed('warmup_tts', self._text_to_speech, "Hello", lang_to)
+        except Exception as e:
+            logger.warning(f"Warmup failed: {e}")
+        finally:
+            self._cleanup_temp_file(warmup_path)
+    
+    @property
+    def ready(self) -> bool:
+        """Backends finished loading and none of them failed"""
+        return self.ready_event.is_set() and not self.init_errors
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until backends are loaded (used by direct, non-queued callers)"""
+        return self.ready_event.wait(Config.STARTUP_TIMEOUT if timeout is None else timeout)
     
     def _init_speech_service(self):
         """Initialize speech-to-text and text-to-speech services"""
         if self.use_gpu:
+            import_start = time.time()
+            torch = importlib.import_module('torch')
+            whisper = importlib.import_module('whisper')
+            self.edge_tts = importlib.import_module('edge_tts')
+            self.startup_timings['import_local_backends'] = round(time.time() - import_start, 3)
+            
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
             logger.info(f"Using device: {self.device}")
             
             # Load Whisper model
             model_name = getattr(Config, 'WHISPER_MODEL', 'base')
-            self.speech_model = whisper.load_model(model_name, device=self.device)
+            self.whisper = whisper
+            self.speech_model = self._timed('load_whisper_model', whisper.load_model, model_name, self.device)
+            self.speech_models = {model_name: self.speech_model}
+            self._speech_models_loading = set()
+            self._speech_models_lock = threading.Lock()
         else:
             # Use OpenAI API
+            import_start = time.time()
+            from openai import OpenAI, AsyncOpenAI
+            self.startup_timings['import_openai'] = round(time.time() - import_start, 3)
             self.openai_client = OpenAI(api_key=Config.OPENAI_TOKEN)
             self.async_openai_client = AsyncOpenAI(api_key=Config.OPENAI_TOKEN)
             
@@ -71,53 +219,83 @@ class TranslationService:
                 'uz': 'nova',  # fallback
             }
     
+    @property
+    def tts_formats(self):
+        """Codecs the active TTS provider can emit without transcoding, preferred first"""
+        if self.use_gpu:
+            return EDGE_TTS_FORMATS
+        return OPENAI_TTS_FORMATS
+    
     def _init_translation_service(self):
-        """Initialize text translation service"""
-        self.translator = None
-        self.hf_translators = {}
+        """Initialize text translation providers and the latency-aware router"""
+        providers = []
         
-        if hasattr(Config, 'DEEPL_TOKEN') and Config.DEEPL_TOKEN:
+        has_deepl = bool(getattr(Config, 'DEEPL_TOKEN', None))
+        if has_deepl:
             try:
-                self.translator = deepl.Translator(Config.DEEPL_TOKEN)
+                providers.append(DeepLProvider(Config.DEEPL_TOKEN))
                 logger.info("DeepL translator initialized")
             except Exception as e:
                 logger.warning(f"Failed to initialize DeepL: {e}")
         else:
             logger.warning("DeepL token not found, using fallback translator")
+        
+        if getattr(Config, 'TILMOCH_TOKEN', None):
+            providers.append(TilmochProvider(Config.TILMOCH_TOKEN, timeout=Config.TRANSLATION_TIMEOUT))
+            logger.info("Tilmoch translator initialized")
+        
+        # Local Marian models only back up DeepL in local mode, or replace it when it's missing
+        if importlib.util.find_spec('transformers') is not None and (self.use_gpu or not has_deepl):
+            # transformers itself is only imported when a pair first falls back to Marian
+            device = 0 if self.use_gpu and getattr(self, 'device', 'cpu') == "cuda" else -1
+            providers.append(MarianProvider(device=device))
+            logger.info("Local Marian translator initialized")
+        
+        self.router = TranslationRouter(
+            providers,
+            hedge_enabled=Config.TRANSLATION_HEDGE_ENABLED,
+            hedge_min_delay=Config.TRANSLATION_HEDGE_MIN_DELAY
+        )
     
-    def __init_translation_service_uz(self, ):
-        self.token = Config.TILMOCH_TOKEN
-        # API endpoint
-        url = "https://websocket.tahrirchi.uz/translate-v2"
-
-        # Headers
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": self.token
-        }
+    def is_duplicate_submission(self, room_id: str, audio_bytes: bytes) -> bool:
+        """True if the same audio was already submitted to this room inside the duplicate window"""
+        return self.duplicate_filter.check((room_id, hash_audio(audio_bytes)))
     
     def _init_audio_queue(self):
-        """Initialize audio processing queue and worker thread"""
-        self.audio_queue = queue.Queue()
+        """Initialize the prioritized processing queue and worker pool"""
+        self.audio_queue = queue.PriorityQueue()
+        self._task_counter = itertools.count()  # FIFO order within a priority
         self.shutdown_event = threading.Event()
         
-        self.worker_thread = threading.Thread(
-            target=self._process_audio_queue, 
-            daemon=True,
-            name="AudioTranslationWorker"
-        )
-        self.worker_thread.start()
+        self.worker_threads = []
+        for i in range(max(1, Config.TRANSLATION_WORKERS)):
+            worker = threading.Thread(
+                target=self._process_audio_queue, 
+                daemon=True,
+                name=f"AudioTranslationWorker-{i}"
+            )
+            worker.start()
+            self.worker_threads.append(worker)
     
     def _process_audio_queue(self):
-        """Background worker thread for processing audio translations"""
-        print("Translation worker thread started")
+        """Background worker thread for processing queued work"""
+        print(f"Translation worker thread started ({threading.current_thread().name})")
+        while not self.ready_event.wait(timeout=1):
+            if self.shutdown_event.is_set():
+                return
         while not self.shutdown_event.is_set():
             try:
-                task = self.audio_queue.get(timeout=1)
-                if task is None:  # Shutdown signal
+                priority, _, func, args, future = self.audio_queue.get(timeout=1)
+                if func is None:  # Shutdown signal
                     break
-                print(f"Processing translation task from queue...")
-                self._handle_translation_task(task)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                print(f"Processing task from queue (priority {priority})...")
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    future.set_exception(e)
+                    raise
             except queue.Empty:
                 continue
             except Exception as e:
@@ -125,72 +303,302 @@ class TranslationService:
                 print(f"Error in audio queue worker: {e}")
         print("Translation worker thread stopped")
     
-    def _handle_translation_task(self, task):
-        """Process a single translation task"""
-        audio_data, lang_from, lang_to, room_id, user_id, socketio = task
+    def submit(self, func, *args, priority: int = PRIORITY_LIVE) -> Future:
+        """Run func(*args) on the worker pool and return a Future for its result"""
+        future = Future()
+        self.audio_queue.put((priority, next(self._task_counter), func, args, future))
+        return future
+    
+    def _handle_translation_task(self, task, handle: Optional[TaskHandle] = None):
+        """Process one utterance for every recipient in the room
+        
+        The audio is transcribed once and split into sentences; each sentence is
+        translated once per target language and synthesized once per (language,
+        codec) pair, concurrently on the segment executor. Segments are sent in
+        order as they finish, so the first sentence plays while later ones are
+        still in progress. Recipients who leave while the task runs are skipped;
+        the task stops once none remain.
+        """
+        audio_data, lang_from, room_id, recipients, socketio, speaker_id, seq = task
         start_time = time.time()
+        with self._live_pending_lock:
+            self._live_pending -= 1
+        if handle:
+            self.quality.record_latency('queue_wait', start_time - handle.created_at)
+        tier = self.quality.evaluate()
+        cancel_event = handle.cancel_event if handle else None
+        
+        def active(recipient):
+            return handle is None or handle.is_active(recipient['user_id'])
+        
+        # Sequence info carried on every payload from this utterance
+        order = {
+            'speaker_id': speaker_id,
+            'seq': seq,
+            'utterance_id': handle.id if handle else None
+        }
         
         try:
-            print(f"Starting translation task: {lang_from} -> {lang_to}")
+            print(f"Starting translation task: {lang_from} -> {sorted({r['language'] for r in recipients})}")
             
             # Step 1: Transcribe audio
             step1_start = time.time()
             print("Step 1: Starting transcription...")
             text = self._transcribe_audio(audio_data, lang_from)
             step1_time = time.time() - step1_start
+            self.quality.record_latency('transcribe', step1_time)
             print(f"Transcribed text: '{text}' (took {step1_time:.2f}s)")
             if not text or not text.strip():
                 print("No text transcribed from audio")
                 return
+            if handle:
+                handle.check()
             
-            # Step 2: Translate text
-            step2_start = time.time()
-            print("Step 2: Starting translation...")
-            translated_text = self._translate_text(text, lang_from, lang_to)
-            step2_time = time.time() - step2_start
-            print(f"Translated text: '{translated_text}' (took {step2_time:.2f}s)")
-            if not translated_text:
-                print("Translation failed")
-                return
+            # Original-only listeners just get the transcript
+            for recipient in recipients:
+                if recipient.get('delivery') == DELIVERY_ORIGINAL and active(recipient):
+                    self._send_translation_result(
+                        socketio, room_id, recipient['user_id'],
+                        None, text, text, delivery=DELIVERY_ORIGINAL,
+                        order=dict(order, segment_index=0, segment_count=1, final=True)
+                    )
             
-            # Step 3: Generate speech
-            step3_start = time.time()
-            print("Step 3: Starting TTS...")
-            audio_bytes = self._text_to_speech(translated_text, lang_to)
-            step3_time = time.time() - step3_start
-            print(f"Generated audio bytes: {len(audio_bytes) if audio_bytes else 0} (took {step3_time:.2f}s)")
-            if not audio_bytes:
-                print("TTS generation failed")
-                return
+            # Steps 2-3: translate and synthesize each sentence concurrently, per language
+            sentences = split_sentences(text, Config.SEGMENT_MIN_CHARS) if Config.SENTENCE_PIPELINING_ENABLED else [text]
+            print(f"Step 2: Translating {len(sentences)} segment(s)...")
+            plans = {}
+            for lang_to, group in self._group_by_language(recipients).items():
+                group = [r for r in group if r.get('delivery') != DELIVERY_ORIGINAL and active(r)]
+                if not group:
+                    continue
+                # Generate speech once per codec, only for listeners who want audio
+                # The text-only quality tier downgrades everyone to captions
+                listeners = [] if tier.get('text_only') else [
+                    r for r in group if r.get('delivery', DELIVERY_AUDIO) == DELIVERY_AUDIO
+                ]
+                codecs = {r['user_id']: self.negotiate_codec(r.get('codecs')) for r in listeners}
+                plans[lang_to] = {'group': group, 'codecs': codecs, 'results': {}, 'next': 0}
+            
+            # Sentence-major order, so every language's first sentence goes first; a cap
+            # on in-flight segments keeps one long utterance from filling the executor
+            jobs = iter([(lang_to, index) for index in range(len(sentences)) for lang_to in plans])
+            futures = {}
+            
+            def submit_next():
+                job = next(jobs, None)
+                if job is None:
+                    return None
+                lang_to, index = job
+                future = self.segment_executor.submit(
+                    self._process_segment, sentences[index], lang_from, lang_to,
+                    set(plans[lang_to]['codecs'].values()), cancel_event
+                )
+                futures[future] = job
+                return future
+            
+            # Step 4: Send each language's segments in order as soon as they are ready
+            try:
+                for _ in range(max(1, Config.SEGMENT_MAX_IN_FLIGHT)):
+                    if submit_next() is None:
+                        break
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        lang_to, index = futures[future]
+                        plan = plans[lang_to]
+                        plan['results'][index] = future.result()
+                        while plan['next'] in plan['results']:
+                            segment = plan['next']
+                            if segment == 0:
+                                first_time = time.time() - start_time
+                                self.quality.record_latency('first_segment', first_time)
+                                print(f"First segment for {lang_to} ready after {first_time:.2f}s")
+                            self._send_segment(
+                                socketio, room_id, plan, plan['results'].pop(segment),
+                                dict(order, segment_index=segment, segment_count=len(sentences),
+                                     final=segment == len(sentences) - 1),
+                                active
+                            )
+                            plan['next'] += 1
+                        if handle:
+                            handle.check()
+                        future = submit_next()
+                        if future is not None:
+                            pending.add(future)
+            finally:
+                # Don't keep working on segments nobody will receive
+                for future in futures:
+                    future.cancel()
             
-            # Step 4: Send to room participants
-            step4_start = time.time()
-            print("Step 4: Sending result...")
-            self._send_translation_result(
-                socketio, room_id, user_id, 
-                audio_bytes, text, translated_text
-            )
-            step4_time = time.time() - step4_start
             total_time = time.time() - start_time
-            print(f"Translation task completed successfully! (Step 4: {step4_time:.2f}s, Total: {total_time:.2f}s)")
+            self.quality.record_latency('total', total_time)
+            print(f"Translation task completed successfully! (Total: {total_time:.2f}s)")
             
+        except TaskCancelled:
+            print(f"Translation task cancelled after {time.time() - start_time:.2f}s - no recipients left")
         except Exception as e:
             print(f"Translation task failed: {e}")
             logger.error(f"Translation task failed: {e}")
         finally:
+            # Release later utterances for anyone this one sent nothing to
+            self._skip_sequence(room_id, speaker_id, seq, recipients)
             # Clean up temporary files
             self._cleanup_temp_file(audio_data)
     
+    def _process_segment(self, sentence: str, lang_from: str, lang_to: str, codecs,
+                         cancel_event: Optional[threading.Event] = None):
+        """Translate one sentence and synthesize it in each codec; runs on the segment executor"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise TaskCancelled("segment skipped")
+        
+        step_start = time.time()
+        translated_text = self._translate_text(sentence, lang_from, lang_to)
+        self.quality.record_latency('translate', time.time() - step_start)
+        
+        audio_by_codec = {}
+        if codecs and translated_text:
+            step_start = time.time()
+            audio_by_codec = self._synthesize_for_codecs(translated_text, lang_to, codecs, cancel_event)
+            self.quality.record_latency('tts', time.time() - step_start)
+        if cancel_event is not None and cancel_event.is_set():
+            raise TaskCancelled("segment aborted")
+        return sentence, translated_text, audio_by_codec
+    
+    def _send_segment(self, socketio, room_id: str, plan: Dict[str, Any], result, order: Dict[str, Any], active):
+        """Send one translated segment to each recipient of a language group"""
+        sentence, translated_text, audio_by_codec = result
+        if not translated_text:
+            print("Translation failed")
+            return
+        for recipient in plan['group']:
+            if not active(recipient):
+                continue
+            codec = plan['codecs'].get(recipient['user_id'])
+            if codec is not None and not audio_by_codec.get(codec):
+                # The translation is still worth showing when speech for this codec failed
+                print(f"TTS generation failed for {codec}, sending text only")
+                codec = None
+            if codec is None:
+                self._send_translation_result(
+                    socketio, room_id, recipient['user_id'],
+                    None, sentence, translated_text, delivery=DELIVERY_TEXT, order=order
+                )
+                continue
+            self._send_translation_result(
+                socketio, room_id, recipient['user_id'],
+                audio_by_codec[codec], sentence, translated_text, codec, order=order
+            )
+    
+    def _skip_sequence(self, room_id: str, speaker_id: Optional[str], seq: Optional[int], recipients):
+        """Mark seq done for recipients; a no-op for those already sent their final result"""
+        if seq is None:
+            return
+        for recipient in recipients:
+            self.reorder.skip(recipient['user_id'], (room_id, speaker_id), seq)
+    
+    @staticmethod
+    def _group_by_language(recipients):
+        """Group recipients by target language, preserving order"""
+        groups = {}
+        for recipient in recipients:
+            groups.setdefault(recipient['language'], []).append(recipient)
+        return groups
+    
+    def negotiate_codec(self, client_codecs) -> str:
+        """Pick the output codec for a client, preferring ones the TTS provider emits natively"""
+        if not client_codecs:
+            return DEFAULT_CODEC  # Legacy clients only understand MP3
+        preference = [c for c in Config.TTS_CODEC_PREFERENCE if c in client_codecs and c in AUDIO_CODECS]
+        for codec in preference:
+            if codec in self.tts_formats:
+                return codec
+        return preference[0] if preference else DEFAULT_CODEC
+    
+    def _synthesize_for_codecs(self, text: str, language: str, codecs,
+                               cancel_event: Optional[threading.Event] = None) -> Dict[str, bytes]:
+        """Synthesize natively in each supported codec, transcoding once for the rest"""
+        audio_by_codec = {}
+        for codec in codecs:
+            if codec in self.tts_formats:
+                audio_by_codec[codec] = self._text_to_speech(text, language, codec, cancel_event)
+        
+        missing = [codec for codec in codecs if codec not in audio_by_codec]
+        if missing:
+            source_codec = next((c for c, data in audio_by_codec.items() if data), self.tts_formats[0])
+            if source_codec not in audio_by_codec:
+                audio_by_codec[source_codec] = self._text_to_speech(text, language, source_codec, cancel_event)
+            for codec in missing:
+                print(f"Transcoding {source_codec} -> {codec} for {language}")
+                audio_by_codec[codec] = transcode_audio(audio_by_codec[source_codec], codec)
+        return audio_by_codec
+    
+    def _get_speech_model(self, model_name: str):
+        """Return a loaded Whisper model, loading other tiers' models in the background"""
+        model = self.speech_models.get(model_name)
+        if model is not None:
+            return model
+        with self._speech_models_lock:
+            start_load = model_name not in self._speech_models_loading
+            self._speech_models_loading.add(model_name)
+        if start_load:
+            def load():
+                try:
+                    self.speech_models[model_name] = self.whisper.load_model(model_name, device=self.device)
+                    logger.info(f"Loaded Whisper model {model_name} for quality tiers")
+                except Exception as e:
+                    logger.error(f"Failed to load Whisper model {model_name}: {e}")
+            
+            threading.Thread(target=load, daemon=True, name=f"WhisperLoad-{model_name}").start()
+        # Keep using the default model until the tier's model is ready
+        return self.speech_model
+    
     def _transcribe_audio(self, audio_data, language: str) -> str:
-        """Transcribe audio to text"""
+        """Transcribe audio to text, reusing cached transcripts of identical audio"""
+        try:
+            audio_hash = hash_audio(audio_data)
+        except Exception as e:
+            logger.warning(f"Could not hash audio for transcript cache: {e}")
+            audio_hash = None
+        
+        # One tier for both the lookup and the transcription, so the cache key matches the model used
+        tier = self.quality.tier
+        if self.use_gpu:
+            asr = (tier.get('whisper_model', Config.WHISPER_MODEL), bool(tier.get('greedy')))
+        else:
+            asr = tier.get('asr_api_model', 'whisper-1')
+        
+        if audio_hash:
+            cached = self.transcript_cache.get(audio_hash, language, asr)
+            if cached is not None:
+                print(f"Transcript cache hit ({audio_hash[:12]}, {language})")
+                return cached
+        
+        text = self._run_transcription(audio_data, language, tier)
+        if text and audio_hash:
+            self.transcript_cache.put(audio_hash, language, text, asr)
+        return text
+    
+    def _run_transcription(self, audio_data, language: str, tier: Dict[str, Any]) -> str:
+        """Call the speech-to-text backend with the given quality tier's settings"""
         try:
             if self.use_gpu:
-                result = self.speech_model.transcribe(audio_data, language=language)
+                model = self._get_speech_model(tier.get('whisper_model', Config.WHISPER_MODEL))
+                options = {}
+                if tier.get('greedy'):
+                    # Single greedy pass, no temperature fallback
+                    options = {'temperature': 0.0, 'beam_size': None, 'best_of': None,
+                               'condition_on_previous_text': False}
+                # 16 kHz WAV/FLAC decodes in-process and skips Whisper's ffmpeg launch;
+                # anything else (e.g. WebM) goes to Whisper as a file
+                pcm = prepare_audio_for_asr(audio_data)
+                audio_input = pcm.samples[:, 0] if pcm is not None else audio_data
+                result = model.transcribe(audio_input, language=language, **options)
                 return result["text"].strip()
             else:
                 with open(audio_data, "rb") as f:
                     result = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
+                        model=tier.get('asr_api_model', 'whisper-1'),
                         file=f,
                         response_format="text"
                     )
@@ -203,108 +611,111 @@ class TranslationService:
         """Translate text between languages"""
         if lang_from == lang_to:
             return text
-        if lang_to == "en":
-            lang_to = "EN-US"
             
         try:
-            if self.translator:
-                # Use DeepL for better quality
-                result = self.translator.translate_text(
-                    text=text,
-                    source_lang=lang_from.upper(),
-                    target_lang=lang_to.upper()
-                )
-                return result.text
-            else:
-                # Fallback to HuggingFace
-                return self._translate_with_huggingface(text, lang_from, lang_to)
+            return self.translate_flight.do(
+                (text, lang_from, lang_to),
+                self.router.translate, text, lang_from, lang_to
+            )
         except Exception as e:
             logger.error(f"Translation error: {e}")
             return text  # Return original if translation fails
     
-    def _translate_with_huggingface(self, text: str, lang_from: str, lang_to: str) -> str:
-        """Translate using HuggingFace transformers"""
-        model_name = f"Helsinki-NLP/opus-mt-{lang_from}-{lang_to}"
-        
-        if model_name not in self.hf_translators:
+    def _text_to_speech(self, text: str, language: str, codec: str = DEFAULT_CODEC,
+                        cancel_event: Optional[threading.Event] = None) -> bytes:
+        """Convert text to speech in the requested codec, aborting if cancel_event is set"""
+        key = (text, language, codec, self.quality.tier.get('tts_model'))
+        # Retry once if we joined a call whose own task was cancelled under us
+        for attempt in range(2):
             try:
-                device = 0 if self.use_gpu and self.device == "cuda" else -1
-                self.hf_translators[model_name] = pipeline(
-                    "translation",
-                    model=model_name,
-                    device=device
-                )
+                return self.tts_flight.do(key, self._synthesize, text, language, codec, cancel_event,
+                                          cancel_event=cancel_event)
+            except (TaskCancelled, CancelledError):
+                if attempt == 0 and not (cancel_event and cancel_event.is_set()):
+                    continue
+                print("TTS request aborted - task cancelled")
+                return b""
             except Exception as e:
-                logger.error(f"Failed to load translation model {model_name}: {e}")
-                return text
+                logger.error(f"TTS error: {e}")
+                return b""
+        return b""
+    
+    def _synthesize(self, text: str, language: str, codec: str,
+                    cancel_event: Optional[threading.Event] = None) -> bytes:
+        """Run one TTS provider request, transcoding if the provider can't emit codec"""
+        # Create new event loop for this thread
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         
         try:
-            result = self.hf_translators[model_name](text)
-            return result[0]['translation_text']
-        except Exception as e:
-            logger.error(f"HuggingFace translation error: {e}")
-            return text
+            native = codec if codec in self.tts_formats else self.tts_formats[0]
+            audio_data = loop.run_until_complete(
+                self._run_cancellable(self._text_to_speech_async(text, language, native), cancel_event)
+            )
+        finally:
+            loop.close()
+        
+        if audio_data and native != codec:
+            audio_data = transcode_audio(audio_data, codec)
+        return audio_data
     
-    def _text_to_speech(self, text: str, language: str) -> bytes:
-        """Convert text to speech"""
+    @staticmethod
+    async def _run_cancellable(coro, cancel_event: Optional[threading.Event]):
+        """Await coro, cancelling the in-flight request as soon as cancel_event is set"""
+        task = asyncio.ensure_future(coro)
+        if cancel_event is None:
+            return await task
+        while not task.done():
+            if cancel_event.is_set():
+                task.cancel()
+                break
+            await asyncio.wait({task}, timeout=0.1)
         try:
-            # Create new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                return loop.run_until_complete(self._text_to_speech_async(text, language))
-            finally:
-                loop.close()
-        except Exception as e:
-            logger.error(f"TTS error: {e}")
-            return b""
+            return await task
+        except asyncio.CancelledError:
+            raise TaskCancelled("provider call aborted")
     
-    async def _text_to_speech_async(self, text: str, language: str) -> bytes:
+    async def _text_to_speech_async(self, text: str, language: str, codec: str = DEFAULT_CODEC) -> bytes:
         """Async text-to-speech conversion"""
         try:
             if self.use_gpu:
                 return await self._edge_tts(text, language)
             else:
-                return await self._openai_tts(text, language)
+                return await self._openai_tts(text, language, codec)
         except Exception as e:
             logger.error(f"Async TTS error: {e}")
             return b""
     
     async def _edge_tts(self, text: str, language: str) -> bytes:
-        """Generate speech using Edge TTS and ensure MP3 output"""
+        """Generate speech using Edge TTS (MP3 output)"""
         try:
             voice = getattr(Config, 'VOICE_MAP', {}).get(language, 'en-US-AriaNeural')
-            communicate = edge_tts.Communicate(text, voice)
+            communicate = self.edge_tts.Communicate(text, voice)
             
             audio_data = b""
             async for chunk in communicate.stream():
                 if chunk["type"] == "audio":
                     audio_data += chunk["data"]
             
-            # Convert to MP3 if not already
-            if not audio_data.startswith(b'ID3') and not audio_data[:2] == b'\xff\xfb':
-                # Assume WAV or other format, convert to MP3
-                audio_segment = AudioSegment.from_file(io.BytesIO(audio_data))
-                mp3_io = io.BytesIO()
-                audio_segment.export(mp3_io, format="mp3")
-                audio_data = mp3_io.getvalue()
+            # Edge TTS streams MP3 frames; only re-encode if it ever sends something else
+            if audio_data and detect_audio_codec(audio_data) != 'mp3':
+                audio_data = transcode_audio(audio_data, 'mp3')
             
             return audio_data
         except Exception as e:
             logger.error(f"Edge TTS error: {e}")
             return b""
     
-    async def _openai_tts(self, text: str, language: str) -> bytes:
+    async def _openai_tts(self, text: str, language: str, codec: str = DEFAULT_CODEC) -> bytes:
         """Generate speech using OpenAI TTS"""
         try:
             voice = self.voice_map.get(language, "nova")
             
             async with self.async_openai_client.audio.speech.with_streaming_response.create(
-                model="tts-1",
+                model=self.quality.tier.get('tts_model', 'tts-1'),
                 voice=voice,
                 input=text,
-                response_format="mp3"
+                response_format=codec
             ) as response:
                 audio_data = b""
                 async for chunk in response.iter_bytes():
@@ -315,20 +726,50 @@ class TranslationService:
             return b""
     
     def _send_translation_result(self, socketio, room_id: str, user_id: str, 
-                               audio_bytes: bytes, original_text: str, 
-                               translated_text: str):
-        """Send translation result to the intended recipient only"""
+                               audio_bytes: Optional[bytes], original_text: str, 
+                               translated_text: str, codec: str = DEFAULT_CODEC,
+                               delivery: str = DELIVERY_AUDIO, order: Optional[Dict[str, Any]] = None):
+        """Send translation result to the intended recipient only, in speaker order
+        
+        order holds 'speaker_id', 'seq', 'utterance_id' and the segment fields
+        'segment_index', 'segment_count' and 'final'; results with a seq go
+        through the listener's reorder buffer, completing on the final segment.
+        """
         try:
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            print(f"Sending translation result to room {room_id}, target user: {user_id}")
-            print(f"Audio size: {len(audio_bytes)} bytes, Base64 size: {len(audio_base64)} chars")
-            
-            socketio.emit('translated_audio', {
-                'audio': audio_base64,
+            payload = {
                 'text': translated_text,
                 'original_text': original_text,
+                'delivery': delivery,
+                'room_id': room_id,
                 'target_user': user_id  # specify which user should receive this translation
-            }, room=room_id)  # emit to the entire room
+            }
+            if order:
+                payload.update(order)
+            print(f"Sending translation result to room {room_id}, target user: {user_id} ({delivery})")
+            
+            if audio_bytes:
+                audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+                print(f"Audio size: {len(audio_bytes)} bytes ({codec}), Base64 size: {len(audio_base64)} chars")
+                payload.update({
+                    'audio': audio_base64,
+                    'format': codec,
+                    'mime': AUDIO_CODECS[codec]['mime']
+                })
+            
+            def send(late: bool = False):
+                if late:
+                    # Audio for an item the listener has moved past would play out of order
+                    late_payload = {k: v for k, v in payload.items() if k not in ('audio', 'format', 'mime')}
+                    late_payload['late'] = True
+                    socketio.emit('translated_audio', late_payload, room=user_id)
+                    return
+                socketio.emit('translated_audio', payload, room=user_id)  # each client's sid is its own room
+            
+            if order and order.get('seq') is not None:
+                self.reorder.deliver(user_id, (room_id, order['speaker_id']), order['seq'], send,
+                                     final=order.get('final', True))
+            else:
+                send()
             
             print("Translation result sent successfully!")
         except Exception as e:
@@ -346,35 +787,89 @@ class TranslationService:
     # Public API methods
     def transcribe_audio(self, audio_path: str, language: str = "en") -> str:
         """Transcribe audio file to text"""
+        self.wait_until_ready()
         return self._transcribe_audio(audio_path, language)
     
     def translate_text(self, text: str, lang_from: str, lang_to: str) -> str:
         """Translate text between languages"""
+        self.wait_until_ready()
         return self._translate_text(text, lang_from, lang_to)
     
-    def text_to_speech(self, text: str, language: str) -> bytes:
+    def text_to_speech(self, text: str, language: str, codec: str = DEFAULT_CODEC) -> bytes:
         """Convert text to speech"""
-        return self._text_to_speech(text, language)
+        self.wait_until_ready()
+        return self._text_to_speech(text, language, codec)
     
-    def add_translation_task(self, audio_data, lang_from: str, lang_to: str, 
-                           room_id: str, user_id: str, socketio):
-        """Add a translation task to the processing queue"""
+    def add_translation_task(self, audio_data, lang_from: str, room_id: str,
+                           recipients, socketio, speaker_id: Optional[str] = None):
+        """Add a translation task for one utterance to the processing queue
+        
+        recipients is a list of dicts with 'user_id', 'language' and optional
+        'codecs' and 'delivery' (one of DELIVERY_MODES, default audio).
+        Tasks of a room armed through /debug/profile/tasks run under cProfile.
+        Utterances with a speaker_id are numbered and delivered to each
+        recipient in the order they were received.
+        """
+        seq = None
         try:
-            print(f"Adding translation task to queue: {lang_from} -> {lang_to}")
-            self.audio_queue.put((audio_data, lang_from, lang_to, room_id, user_id, socketio))
+            print(f"Adding translation task to queue: {lang_from} -> {len(recipients)} recipient(s)")
+            if speaker_id is not None:
+                seq = self.reorder.register((room_id, speaker_id), [r['user_id'] for r in recipients])
+            with self._live_pending_lock:
+                self._live_pending += 1
+            handle = TaskHandle(room_id, [r['user_id'] for r in recipients])
+            self.task_registry.register(handle)
+            args = ((audio_data, lang_from, room_id, recipients, socketio, speaker_id, seq), handle)
+            if self.task_profiles.take(room_id):
+                label = f"room={room_id} {lang_from}->{sorted({r['language'] for r in recipients})}"
+                handle.future = self.submit(
+                    self.task_profiles.run, label, self._handle_translation_task, *args,
+                    priority=PRIORITY_LIVE
+                )
+            else:
+                handle.future = self.submit(self._handle_translation_task, *args, priority=PRIORITY_LIVE)
+            handle.future.add_done_callback(
+                lambda future: self._on_translation_task_done(future, handle, args[0])
+            )
             print(f"Task added to queue. Queue size: {self.audio_queue.qsize()}")
         except Exception as e:
             logger.error(f"Failed to add translation task: {e}")
             print(f"Failed to add translation task: {e}")
+            self._skip_sequence(room_id, speaker_id, seq, recipients)
+    
+    def _on_translation_task_done(self, future: Future, handle: TaskHandle, task):
+        """Forget a finished task; tasks cancelled while still queued never ran, so clean up here"""
+        audio_data, _, room_id, recipients, _, speaker_id, seq = task
+        self.task_registry.unregister(handle)
+        if future.cancelled():
+            with self._live_pending_lock:
+                self._live_pending -= 1
+            self._skip_sequence(room_id, speaker_id, seq, recipients)
+            self._cleanup_temp_file(audio_data)
+            print(f"Dropped queued translation task for room {handle.room_id}")
+    
+    def cancel_recipient_tasks(self, user_id: str, room_id: Optional[str] = None) -> int:
+        """Stop pending work for a recipient who left a room (or disconnected, if room_id is None)"""
+        return self.task_registry.cancel_recipient(user_id, room_id)
+    
+    def cancel_room_tasks(self, room_id: str) -> int:
+        """Drop the whole backlog of a room that has emptied"""
+        return self.task_registry.cancel_room(room_id)
     
     def shutdown(self):
         """Gracefully shutdown the service"""
         logger.info("Shutting down translation service...")
         self.shutdown_event.set()
-        self.audio_queue.put(None)  # Signal worker to stop
+        for _ in self.worker_threads:
+            # Signal each worker to stop, ahead of any queued work
+            self.audio_queue.put((-1, next(self._task_counter), None, (), None))
         
-        if self.worker_thread.is_alive():
-            self.worker_thread.join(timeout=5)
+        for worker in self.worker_threads:
+            if worker.is_alive():
+                worker.join(timeout=5)
+        self.segment_executor.shutdown(wait=False)
+        if self.router:
+            self.router.executor.shutdown(wait=False)
         
         logger.info("Translation service shutdown complete")
     
@@ -383,7 +878,22 @@ class TranslationService:
         return {
             'gpu_enabled': self.use_gpu,
             'device': getattr(self, 'device', 'cpu'),
-            'deepl_available': self.translator is not None,
+            'ready': self.ready,
+            'init_error': dict(self.init_errors) or None,
+            'startup_timings': dict(self.startup_timings),
+            'deepl_available': bool(self.router and self.router.has_provider('deepl')),
+            'translation': self.router.get_stats() if self.router else None,
+            'transcript_cache': self.transcript_cache.get_stats(),
+            'duplicates_dropped': self.duplicate_filter.dropped,
+            'quality': self.quality.get_stats(),
+            'coalescing': {
+                'translate': self.translate_flight.get_stats(),
+                'tts': self.tts_flight.get_stats()
+            },
+            'tasks': self.task_registry.get_stats(),
+            'reorder': self.reorder.get_stats(),
+            'live_pending': self._live_pending,
             'queue_size': self.audio_queue.qsize(),
-            'worker_alive': self.worker_thread.is_alive()
+            'worker_alive': any(worker.is_alive() for worker in self.worker_threads),
+            'workers_alive': sum(worker.is_alive() for worker in self.worker_threads)
         }
\ No newline at end of file
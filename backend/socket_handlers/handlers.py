@@ -4,6 +4,7 @@ import logging
 from flask import request, current_app
 from flask_socketio import emit, join_room, leave_room
 from utils.audio_utils import cleanup_temp_file
+from services.translation_service import DELIVERY_AUDIO, DELIVERY_MODES
 
 logger = logging.getLogger(__name__)
 
@@ -30,14 +31,23 @@ def register_socket_handlers(socketio, translation_service):
                 users.remove(request.sid)
                 leave_room(room_id)
                 emit('user_left', {'user_id': request.sid}, room=room_id)
-                # Clean up empty rooms
+                # Clean up empty rooms and drop their backlog
                 if not users:
                     del active_rooms[room_id]
+                    translation_service.cancel_room_tasks(room_id)
                 break
         
+        # Stop work queued for this user in any room
+        translation_service.cancel_recipient_tasks(request.sid)
+        translation_service.reorder.drop_participant(request.sid)
+        
         # Clean up user language preferences
         if request.sid in user_languages:
             del user_languages[request.sid]
+        user_codecs = getattr(current_app, 'user_codecs', {})
+        user_codecs.pop(request.sid, None)
+        user_delivery = getattr(current_app, 'user_delivery', {})
+        user_delivery.pop(request.sid, None)
 
     @socketio.on('join_room')
     def handle_join_room(data):
@@ -51,6 +61,17 @@ def register_socket_handlers(socketio, translation_service):
         # Store user language preference
         user_languages[request.sid] = user_lang
         
+        # Store the audio codecs this client can play (e.g. ['opus', 'mp3'])
+        codecs = data.get('codecs')
+        if isinstance(codecs, list):
+            user_codecs = getattr(current_app, 'user_codecs', {})
+            user_codecs[request.sid] = [str(c).lower() for c in codecs]
+        
+        # Store how this listener wants translations delivered
+        delivery = data.get('delivery', DELIVERY_AUDIO)
+        user_delivery = getattr(current_app, 'user_delivery', {})
+        user_delivery[request.sid] = delivery if delivery in DELIVERY_MODES else DELIVERY_AUDIO
+        
         # Add user to room
         if room_id not in active_rooms:
             active_rooms[room_id] = []
@@ -74,6 +95,19 @@ def register_socket_handlers(socketio, translation_service):
                 'users_count': len(active_rooms[room_id])
             })
 
+    @socketio.on('set_delivery_mode')
+    def handle_set_delivery_mode(data):
+        """Switch between audio+text, text-only and original-only delivery mid-session"""
+        mode = data.get('mode')
+        if mode not in DELIVERY_MODES:
+            emit('error', {'message': f'Unknown delivery mode: {mode}'})
+            return
+        
+        user_delivery = getattr(current_app, 'user_delivery', {})
+        user_delivery[request.sid] = mode
+        logger.info(f"User {request.sid} switched delivery mode to {mode}")
+        emit('delivery_mode', {'mode': mode})
+
     @socketio.on('leave_room')
     def handle_leave_room(data):
         room_id = data['room_id']
@@ -87,9 +121,13 @@ def register_socket_handlers(socketio, translation_service):
             
             logger.info(f"User {request.sid} left room {room_id}")
             
-            # Clean up empty rooms
+            # Stop work queued for this user in this room
+            translation_service.cancel_recipient_tasks(request.sid, room_id)
+            
+            # Clean up empty rooms and drop their backlog
             if not active_rooms[room_id]:
                 del active_rooms[room_id]
+                translation_service.cancel_room_tasks(room_id)
             
             emit('user_left', {'user_id': request.sid}, room=room_id)
 
@@ -114,35 +152,50 @@ def register_socket_handlers(socketio, translation_service):
             audio_data = base64.b64decode(audio_base64)
             print(f"Decoded audio size: {len(audio_data)} bytes")
             
+            # Drop client retries of a recording this room is already handling
+            if translation_service.is_duplicate_submission(room_id, audio_data):
+                print(f"Dropping duplicate audio submission from {request.sid} in room {room_id}")
+                return
+            
             # Save to temporary file for Whisper processing
             with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp_file:
                 tmp_file.write(audio_data)
                 tmp_file_path = tmp_file.name
             
-            # For each recipient in the room (except sender), queue a translation task for their language
+            # Collect every recipient in the room (except sender) that needs a translation
+            recipients = []
             if room_id in active_rooms:
                 print(f"Room {room_id} has {len(active_rooms[room_id])} users: {active_rooms[room_id]}")
+                user_codecs = getattr(current_app, 'user_codecs', {})
+                user_delivery = getattr(current_app, 'user_delivery', {})
                 for recipient_id in active_rooms[room_id]:
                     if recipient_id != request.sid:
                         target_lang = user_languages.get(recipient_id, 'en')
                         print(f"Recipient {recipient_id} language: {target_lang}, sender language: {user_lang}")
                         if target_lang != user_lang:  # Only translate if languages are different
-                            print(f"Adding translation task: {user_lang} -> {target_lang}")
-                            translation_service.add_translation_task(
-                                tmp_file_path,
-                                user_lang,
-                                target_lang,
-                                room_id,  # still pass room_id for context, but not used for emission
-                                recipient_id,  # pass recipient's socket ID
-                                socketio
-                            )
+                            recipients.append({
+                                'user_id': recipient_id,
+                                'language': target_lang,
+                                'codecs': user_codecs.get(recipient_id),
+                                'delivery': user_delivery.get(recipient_id, DELIVERY_AUDIO)
+                            })
                         else:
                             print(f"Skipping translation - same language ({user_lang})")
             else:
                 print(f"Room {room_id} not found in active_rooms: {list(active_rooms.keys())}")
             
-            # Clean up temp file after processing
-            cleanup_temp_file(tmp_file_path, delay=5)
+            if recipients:
+                # One task per utterance; the worker removes the temp file when done
+                translation_service.add_translation_task(
+                    tmp_file_path,
+                    user_lang,
+                    room_id,
+                    recipients,
+                    socketio,
+                    speaker_id=request.sid
+                )
+            else:
+                cleanup_temp_file(tmp_file_path, delay=0)
             
         except Exception as e:
             logger.error(f"Error handling audio data: {e}")
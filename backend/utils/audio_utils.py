@@ -2,12 +2,53 @@ import os
 import time
 import threading
 import logging
-from pydub import AudioSegment
+import io
 import tempfile
 import base64
+# pydub is imported inside the functions that need it to keep module import cheap
+from utils import pcm_audio
+from utils.pcm_audio import PcmAudio, decode_audio
 
 logger = logging.getLogger(__name__)
 
+# Output codecs we can deliver to clients: pydub/ffmpeg export settings and MIME type
+AUDIO_CODECS = {
+    'opus': {'format': 'ogg', 'codec': 'libopus', 'mime': 'audio/ogg; codecs=opus'},
+    'mp3': {'format': 'mp3', 'codec': None, 'mime': 'audio/mpeg'},
+    'aac': {'format': 'adts', 'codec': 'aac', 'mime': 'audio/aac'},
+    'flac': {'format': 'flac', 'codec': None, 'mime': 'audio/flac'},
+    'wav': {'format': 'wav', 'codec': None, 'mime': 'audio/wav'},
+}
+DEFAULT_CODEC = 'mp3'
+
+def detect_audio_codec(audio_data):
+    """Guess the codec of encoded audio bytes from their header"""
+    if audio_data.startswith(b'ID3'):
+        return 'mp3'
+    if len(audio_data) > 1 and audio_data[0] == 0xFF and (audio_data[1] & 0xE0) == 0xE0:
+        # MPEG frame sync; layer bits 01 mean Layer III, 00 with ADTS is AAC
+        return 'mp3' if (audio_data[1] & 0x06) == 0x02 else 'aac'
+    if audio_data.startswith(b'OggS'):
+        return 'opus' if b'OpusHead' in audio_data[:64] else 'ogg'
+    if audio_data.startswith(b'fLaC'):
+        return 'flac'
+    if audio_data.startswith(b'RIFF') and audio_data[8:12] == b'WAVE':
+        return 'wav'
+    return None
+
+def transcode_audio(audio_data, codec):
+    """Re-encode audio bytes into one of AUDIO_CODECS"""
+    try:
+        from pydub import AudioSegment
+        settings = AUDIO_CODECS[codec]
+        audio = AudioSegment.from_file(io.BytesIO(audio_data))
+        output = io.BytesIO()
+        audio.export(output, format=settings['format'], codec=settings['codec'])
+        return output.getvalue()
+    except Exception as e:
+        logger.error(f"Error transcoding audio to {codec}: {e}")
+        return b""
+
 def cleanup_temp_file(file_path, delay=5):
     """Clean up temporary file after a delay"""
     def cleanup():
@@ -24,6 +65,7 @@ def cleanup_temp_file(file_path, delay=5):
 def convert_audio_format(input_path, output_path, target_format="wav"):
     """Convert audio file to specified format"""
     try:
+        from pydub import AudioSegment
         audio = AudioSegment.from_file(input_path)
         audio.export(output_path, format=target_format)
         return True
@@ -31,18 +73,18 @@ def convert_audio_format(input_path, output_path, target_format="wav"):
         logger.error(f"Error converting audio format: {e}")
         return False
 
+def _as_pcm(audio):
+    """Accept either an already-decoded PcmAudio buffer or something decode_audio can read"""
+    return audio if isinstance(audio, PcmAudio) else decode_audio(audio)
+
 def normalize_audio(audio_path, target_dBFS=-20.0):
     """Normalize audio volume"""
     try:
-        audio = AudioSegment.from_file(audio_path)
-        normalized_audio = audio.normalize()
-        
-        # Adjust to target dBFS
-        change_in_dBFS = target_dBFS - normalized_audio.dBFS
-        normalized_audio = normalized_audio.apply_gain(change_in_dBFS)
+        audio = decode_audio(audio_path)
+        normalized_audio = pcm_audio.normalize_loudness(audio, target_dBFS)
         
         # Save normalized audio
-        normalized_audio.export(audio_path, format="wav")
+        pcm_audio.write_wav(normalized_audio, audio_path)
         return True
     except Exception as e:
         logger.error(f"Error normalizing audio: {e}")
@@ -51,6 +93,7 @@ def normalize_audio(audio_path, target_dBFS=-20.0):
 def split_audio_chunks(audio_path, chunk_duration_ms=30000):
     """Split audio into chunks for processing"""
     try:
+        from pydub import AudioSegment
         audio = AudioSegment.from_file(audio_path)
         chunks = []
         
@@ -63,6 +106,52 @@ def split_audio_chunks(audio_path, chunk_duration_ms=30000):
         logger.error(f"Error splitting audio: {e}")
         return []
 
+def split_audio_on_silence(audio_path, chunk_duration_ms=30000, overlap_ms=1000,
+                           search_window_ms=5000, min_silence_len=300, silence_thresh=-40,
+                           sample_rate=16000):
+    """Split audio into ~chunk_duration_ms segments cut at silence, each overlapping the previous one
+    
+    Returns a list of (start_ms, end_ms, AudioSegment) tuples, mono at sample_rate.
+    The upload is decoded once at that rate, so neither silence detection nor the
+    chunks pay for the original sample rate. Silence is only searched in the last
+    search_window_ms before each nominal cut, so long files stay cheap.
+    """
+    try:
+        from pydub import AudioSegment
+        from pydub.silence import detect_silence
+        # ffmpeg downmixes and resamples while decoding; WAV input is read
+        # directly by pydub, so convert it here (a no-op once already there)
+        audio = AudioSegment.from_file(audio_path, parameters=['-ac', '1', '-ar', str(sample_rate)])
+        audio = audio.set_channels(1).set_frame_rate(sample_rate)
+        segments = []
+        cursor = 0
+        
+        while cursor < len(audio):
+            end = cursor + chunk_duration_ms
+            if end >= len(audio):
+                end = len(audio)
+            else:
+                window_start = max(cursor, end - search_window_ms)
+                silences = detect_silence(
+                    audio[window_start:end],
+                    min_silence_len=min_silence_len,
+                    silence_thresh=silence_thresh,
+                    seek_step=10
+                )
+                if silences:
+                    # Cut in the middle of the silence closest to the nominal end
+                    silence_start, silence_end = silences[-1]
+                    end = window_start + (silence_start + silence_end) // 2
+            
+            start = max(0, cursor - overlap_ms) if segments else cursor
+            segments.append((start, end, audio[start:end]))
+            cursor = end
+        
+        return segments
+    except Exception as e:
+        logger.error(f"Error splitting audio on silence: {e}")
+        return []
+
 def save_audio_chunks(chunks, output_dir):
     """Save audio chunks to files"""
     try:
@@ -81,6 +170,7 @@ def save_audio_chunks(chunks, output_dir):
 def merge_audio_files(audio_paths, output_path):
     """Merge multiple audio files into one"""
     try:
+        from pydub import AudioSegment
         combined = AudioSegment.empty()
         
         for audio_path in audio_paths:
@@ -94,29 +184,22 @@ def merge_audio_files(audio_paths, output_path):
         logger.error(f"Error merging audio files: {e}")
         return False
 
-def get_audio_duration(audio_path):
-    """Get audio duration in seconds"""
+def get_audio_duration(audio):
+    """Get audio duration in seconds (from a path, bytes or a decoded PcmAudio)"""
     try:
-        audio = AudioSegment.from_file(audio_path)
-        return len(audio) / 1000.0  # Convert to seconds
+        return _as_pcm(audio).duration_seconds
     except Exception as e:
         logger.error(f"Error getting audio duration: {e}")
         return 0
 
-def is_audio_file_valid(audio_path):
+def is_audio_file_valid(audio):
     """Check if audio file is valid and can be processed"""
     try:
-        if not os.path.exists(audio_path):
+        if not isinstance(audio, (PcmAudio, bytes, bytearray)) and not os.path.exists(audio):
             return False
         
-        # Try to load the audio file
-        audio = AudioSegment.from_file(audio_path)
-        
-        # Check if audio has content
-        if len(audio) == 0:
-            return False
-        
-        return True
+        # Try to decode the audio and check it has content
+        return _as_pcm(audio).frame_count > 0
     except Exception as e:
         logger.error(f"Audio file validation error: {e}")
         return False
@@ -124,17 +207,15 @@ def is_audio_file_valid(audio_path):
 def reduce_audio_noise(audio_path, noise_reduction_factor=0.5):
     """Apply basic noise reduction to audio"""
     try:
-        audio = AudioSegment.from_file(audio_path)
+        audio = decode_audio(audio_path)
         
-        # Apply high-pass filter to remove low-frequency noise
         # This is a simple approach - more sophisticated noise reduction
         # would require additional libraries like noisereduce
         
-        # Normalize and apply gain
-        normalized = audio.normalize()
-        
-        # Apply compression to reduce dynamic range
-        compressed = normalized.compress_dynamic_range(
+        # Normalize, then compress to reduce dynamic range
+        normalized = pcm_audio.peak_normalize(audio)
+        compressed = pcm_audio.compress_dynamic_range(
+            normalized,
             threshold=-20.0,
             ratio=4.0,
             attack=5.0,
@@ -142,12 +223,28 @@ def reduce_audio_noise(audio_path, noise_reduction_factor=0.5):
         )
         
         # Save processed audio
-        compressed.export(audio_path, format="wav")
+        pcm_audio.write_wav(compressed, audio_path)
         return True
     except Exception as e:
         logger.error(f"Error reducing audio noise: {e}")
         return False
 
+def prepare_audio_for_asr(audio):
+    """Decode a clip in-process into 16 kHz mono samples for Whisper, untouched otherwise
+    
+    Returns None when that would take ffmpeg or resampling (e.g. WebM uploads)
+    or the clip is empty; pass the file to Whisper then, whose single ffmpeg
+    decode resamples properly.
+    """
+    try:
+        pcm = audio if isinstance(audio, PcmAudio) else pcm_audio.decode_audio_in_process(audio)
+        if pcm is None or pcm.frame_count == 0 or pcm.sample_rate != pcm_audio.ASR_SAMPLE_RATE:
+            return None
+        return pcm_audio.to_mono(pcm)
+    except Exception as e:
+        logger.error(f"Error preparing audio for ASR: {e}")
+        return None
+
 def base64_to_audio_file(base64_data, output_path):
     """Convert base64 audio data to file"""
     try:
@@ -182,21 +279,10 @@ def create_temp_audio_file(suffix=".wav"):
         logger.error(f"Error creating temporary audio file: {e}")
         return None
 
-def get_audio_info(audio_path):
+def get_audio_info(audio):
     """Get detailed information about audio file"""
     try:
-        audio = AudioSegment.from_file(audio_path)
-        
-        return {
-            'duration_seconds': len(audio) / 1000.0,
-            'sample_rate': audio.frame_rate,
-            'channels': audio.channels,
-            'sample_width': audio.sample_width,
-            'frame_count': audio.frame_count(),
-            'max_dBFS': audio.max_dBFS,
-            'dBFS': audio.dBFS,
-            'rms': audio.rms
-        }
+        return pcm_audio.audio_info(_as_pcm(audio))
     except Exception as e:
         logger.error(f"Error getting audio info: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,245 @@
+import io
+import wave
+import logging
+
+import numpy as np
+
+# soundfile decodes WAV/FLAC/OGG in-process; anything else falls back to one ffmpeg decode
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ASR_SAMPLE_RATE = 16000
+
+
+# Bytes per sample of the libsndfile subtypes we can report; compressed ones decode to 16-bit
+SOUNDFILE_SAMPLE_WIDTHS = {
+    'PCM_S8': 1, 'PCM_U8': 1, 'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4, 'FLOAT': 4, 'DOUBLE': 8
+}
+
+
+class PcmAudio:
+    """Decoded audio held in memory as float32 samples in [-1, 1], shape (frames, channels)
+
+    sample_width is the source's bytes per sample, kept for reporting.
+    """
+
+    def __init__(self, samples, sample_rate, sample_width=2):
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        self.samples = samples
+        self.sample_rate = int(sample_rate)
+        self.sample_width = int(sample_width)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def frame_count(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration_seconds(self):
+        return self.frame_count / float(self.sample_rate) if self.sample_rate else 0.0
+
+    def __len__(self):
+        """Length in milliseconds, like pydub's AudioSegment"""
+        return int(round(self.duration_seconds * 1000))
+
+
+def decode_audio_in_process(source):
+    """Decode with libsndfile only (WAV/FLAC/OGG), or return None if that isn't possible"""
+    if not SOUNDFILE_AVAILABLE:
+        return None
+    data = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    try:
+        with sf.SoundFile(data) as sound_file:
+            samples = sound_file.read(dtype='float32', always_2d=True)
+            sample_width = SOUNDFILE_SAMPLE_WIDTHS.get(sound_file.subtype, 2)
+            return PcmAudio(samples, sound_file.samplerate, sample_width)
+    except Exception:
+        # e.g. WebM/MP3 that libsndfile can't read
+        return None
+
+
+def decode_audio(source):
+    """Decode a file path or encoded bytes into PcmAudio
+
+    In-process via libsndfile when it can read the format; otherwise one
+    pydub decode (ffprobe plus ffmpeg).
+    """
+    pcm = decode_audio_in_process(source)
+    if pcm is not None:
+        return pcm
+
+    data = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    from pydub import AudioSegment
+    segment = AudioSegment.from_file(data)
+    return from_audio_segment(segment)
+
+
+def from_audio_segment(segment):
+    """Convert a pydub AudioSegment into PcmAudio without re-decoding"""
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[segment.sample_width]
+    raw = np.frombuffer(segment.raw_data, dtype=dtype)
+    full_scale = float(1 << (8 * segment.sample_width - 1))
+    samples = raw.reshape(-1, segment.channels).astype(np.float32) / full_scale
+    return PcmAudio(samples, segment.frame_rate, segment.sample_width)
+
+
+def to_wav_bytes(pcm, sample_width=2):
+    """Encode PcmAudio as PCM WAV bytes in-process"""
+    full_scale = float(1 << (8 * sample_width - 1))
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[sample_width]
+    clipped = np.clip(pcm.samples, -1.0, (full_scale - 1) / full_scale)
+    frames = (clipped * full_scale).astype(dtype)
+    if sample_width == 1:
+        frames = (frames.astype(np.int16) + 128).astype(np.uint8)  # 8-bit WAV is unsigned
+
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav_file:
+        wav_file.setnchannels(pcm.channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(pcm.sample_rate)
+        wav_file.writeframes(frames.tobytes())
+    return output.getvalue()
+
+
+def write_wav(pcm, output_path, sample_width=2):
+    """Write PcmAudio to a WAV file"""
+    with open(output_path, 'wb') as f:
+        f.write(to_wav_bytes(pcm, sample_width))
+
+
+def rms(pcm):
+    """Root mean square level in full-scale units"""
+    if pcm.frame_count == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(pcm.samples, dtype=np.float64))))
+
+
+def peak(pcm):
+    if pcm.frame_count == 0:
+        return 0.0
+    return float(np.max(np.abs(pcm.samples)))
+
+
+def to_dbfs(level):
+    return float(20.0 * np.log10(level)) if level > 0 else float('-inf')
+
+
+def dbfs(pcm):
+    """Loudness of the whole buffer in dBFS"""
+    return to_dbfs(rms(pcm))
+
+
+def max_dbfs(pcm):
+    """Peak level in dBFS"""
+    return to_dbfs(peak(pcm))
+
+
+def apply_gain(pcm, gain_db):
+    return PcmAudio(pcm.samples * np.float32(10.0 ** (gain_db / 20.0)), pcm.sample_rate, pcm.sample_width)
+
+
+def peak_normalize(pcm, headroom_db=0.1):
+    """Scale so the loudest sample sits headroom_db below full scale"""
+    level = peak(pcm)
+    if level == 0:
+        return pcm
+    return apply_gain(pcm, -headroom_db - to_dbfs(level))
+
+
+def normalize_loudness(pcm, target_dbfs=-20.0):
+    """Peak normalize, then set the RMS level to target_dbfs, clipping at full scale"""
+    normalized = peak_normalize(pcm)
+    current = dbfs(normalized)
+    if current == float('-inf'):
+        return normalized
+    adjusted = apply_gain(normalized, target_dbfs - current)
+    return PcmAudio(np.clip(adjusted.samples, -1.0, 1.0), adjusted.sample_rate, adjusted.sample_width)
+
+
+def compress_dynamic_range(pcm, threshold=-20.0, ratio=4.0, attack=5.0, release=50.0, frame_ms=5.0):
+    """Downward compression above threshold dBFS with attack/release smoothing (ms)"""
+    if pcm.frame_count == 0:
+        return pcm
+
+    # Per-frame RMS envelope, computed for all frames at once
+    frame_len = max(1, int(pcm.sample_rate * frame_ms / 1000.0))
+    n_frames = -(-pcm.frame_count // frame_len)
+    padded = np.zeros((n_frames * frame_len, pcm.channels), dtype=np.float32)
+    padded[:pcm.frame_count] = pcm.samples
+    frames = padded.reshape(n_frames, frame_len * pcm.channels)
+    level_db = 20.0 * np.log10(np.maximum(np.sqrt(np.mean(np.square(frames), axis=1)), 1e-10))
+
+    target_reduction = np.maximum(level_db - threshold, 0.0) * (1.0 - 1.0 / ratio)
+
+    # One-pole attack/release smoothing of the gain reduction (per frame, not per sample)
+    attack_coef = np.exp(-frame_ms / max(attack, 1e-3))
+    release_coef = np.exp(-frame_ms / max(release, 1e-3))
+    smoothed = np.empty_like(target_reduction)
+    current = 0.0
+    for i, value in enumerate(target_reduction):
+        coef = attack_coef if value > current else release_coef
+        current = coef * current + (1.0 - coef) * value
+        smoothed[i] = current
+
+    gain = np.repeat(10.0 ** (-smoothed / 20.0), frame_len)[:pcm.frame_count].astype(np.float32)
+    return PcmAudio(pcm.samples * gain[:, np.newaxis], pcm.sample_rate, pcm.sample_width)
+
+
+def to_mono(pcm):
+    if pcm.channels == 1:
+        return pcm
+    return PcmAudio(pcm.samples.mean(axis=1), pcm.sample_rate, pcm.sample_width)
+
+
+def resample(pcm, target_rate=ASR_SAMPLE_RATE, mono=True):
+    """Resample (and by default downmix) with linear interpolation, enough for ASR input"""
+    source = to_mono(pcm) if mono else pcm
+    if source.frame_count == 0:
+        return PcmAudio(source.samples, target_rate, source.sample_width)
+    if source.sample_rate == target_rate:
+        return source
+
+    target_count = int(round(source.frame_count * target_rate / float(source.sample_rate)))
+    if target_rate < source.sample_rate:
+        # Crude anti-aliasing: box filter over the decimation factor before interpolating
+        width = int(source.sample_rate // target_rate)
+        if width > 1:
+            kernel = np.ones(width, dtype=np.float32) / width
+            filtered = np.stack(
+                [np.convolve(source.samples[:, c], kernel, mode='same') for c in range(source.channels)],
+                axis=1
+            )
+            source = PcmAudio(filtered, source.sample_rate, source.sample_width)
+
+    positions = np.arange(target_count, dtype=np.float64) * (source.sample_rate / float(target_rate))
+    original = np.arange(source.frame_count, dtype=np.float64)
+    resampled = np.stack(
+        [np.interp(positions, original, source.samples[:, c]) for c in range(source.channels)],
+        axis=1
+    )
+    return PcmAudio(resampled, target_rate, source.sample_width)
+
+
+def audio_info(pcm):
+    """Summary statistics for a decoded buffer, in the source's sample width"""
+    sample_width = pcm.sample_width
+    return {
+        'duration_seconds': pcm.duration_seconds,
+        'sample_rate': pcm.sample_rate,
+        'channels': pcm.channels,
+        'sample_width': sample_width,
+        'frame_count': pcm.frame_count,
+        'max_dBFS': max_dbfs(pcm),
+        'dBFS': dbfs(pcm),
+        'rms': int(rms(pcm) * (1 << (8 * sample_width - 1)))
+    }
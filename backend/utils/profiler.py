@@ -0,0 +1,142 @@
+import io
+import os
+import sys
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from collections import Counter, deque
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Sample the stacks of all threads and report them in collapsed (flamegraph) format"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        # Only one profile at a time; overlapping runs would skew each other
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def sample(self, seconds: float) -> Optional[str]:
+        """Sample for `seconds` and return collapsed stacks, or None if a profile is already running"""
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            return self._collapse(self._collect(seconds))
+        finally:
+            self.lock.release()
+
+    def _collect(self, seconds: float) -> Counter:
+        own_id = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[tuple(reversed(stack))] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    @staticmethod
+    def _collapse(stacks: Counter) -> str:
+        # One "root;caller;callee count" line per unique stack, as flamegraph.pl expects
+        lines = [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+class TaskProfileStore:
+    """Keep cProfile reports of the most recent armed tasks
+
+    Since Python 3.12 cProfile hooks sys.monitoring, which is process-wide: a
+    report covers every thread that ran while the task did (workers, segment
+    executor, socket handlers), not only the task's own thread. Reports are
+    labelled accordingly, and profiling has to be armed per room by an admin.
+    """
+
+    SCOPE = 'process' if sys.version_info >= (3, 12) else 'thread'
+
+    def __init__(self, max_profiles: int = 20, top: int = 40):
+        self.top = top
+        self.profiles = deque(maxlen=max_profiles)
+        self.armed = {}  # room_id -> tasks left to profile
+        self.active = threading.Lock()
+        self.lock = threading.Lock()
+
+    def arm(self, room_id: str, count: int):
+        """Profile the next count tasks of a room (0 disarms)"""
+        with self.lock:
+            if count > 0:
+                self.armed[room_id] = count
+            else:
+                self.armed.pop(room_id, None)
+
+    def take(self, room_id: str) -> bool:
+        """Claim one armed profile for a room's next task"""
+        with self.lock:
+            left = self.armed.get(room_id, 0)
+            if left <= 0:
+                return False
+            if left == 1:
+                del self.armed[room_id]
+            else:
+                self.armed[room_id] = left - 1
+            return True
+
+    def run(self, label: str, func, *args, **kwargs):
+        """Call func under cProfile and store its report under label"""
+        # Only one cProfile session can be active per process
+        if not self.active.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.time()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # 3.12+ refuses while another sys.monitoring tool (debugger, coverage) holds the profiler slot
+            self.active.release()
+            logger.warning(f"Could not start cProfile for {label}, running unprofiled: {e}")
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self.active.release()
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            with self.lock:
+                self.profiles.append({
+                    'label': label,
+                    'scope': self.SCOPE,
+                    'started_at': start,
+                    'duration': round(time.time() - start, 4),
+                    'report': output.getvalue()
+                })
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.profiles)
+
+    def get_armed(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.armed)
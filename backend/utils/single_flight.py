@@ -0,0 +1,93 @@
+import time
+import threading
+from concurrent.futures import CancelledError
+from typing import Any, Dict, Hashable, Optional
+
+# How often a waiting follower re-checks its cancel event
+WAIT_SLICE = 0.1
+
+
+class _Call:
+    """One in-flight execution that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for and share its result (or exception). Nothing is
+    cached once the call finishes.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self.calls = {}  # key -> _Call
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, func, *args,
+           cancel_event: Optional[threading.Event] = None, **kwargs) -> Any:
+        """Run func(*args, **kwargs) once per concurrent key, raising TimeoutError if a follower waits too long
+
+        A follower whose cancel_event is set stops waiting and raises
+        CancelledError; the leader's call carries on for the others. The
+        event only governs waiting, so pass it in args if func needs it too.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            deadline = time.monotonic() + self.timeout
+            while not call.done.wait(min(WAIT_SLICE, max(0.0, deadline - time.monotonic()))):
+                if cancel_event is not None and cancel_event.is_set():
+                    with self.lock:
+                        self.cancelled += 1
+                    raise CancelledError("Cancelled while waiting for in-flight call")
+                if time.monotonic() >= deadline:
+                    with self.lock:
+                        self.timeouts += 1
+                    raise TimeoutError(f"Timed out after {self.timeout}s waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'cancelled': self.cancelled,
+                'in_flight': len(self.calls)
+            }
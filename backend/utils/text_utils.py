@@ -0,0 +1,52 @@
+import re
+from typing import List
+
+# Sentence end: terminal punctuation plus closing quotes/brackets, followed by
+# whitespace; CJK full-width terminators need no whitespace after them
+_SENTENCE_END = re.compile(r'[.!?…।؟]["\'»”)\]]*\s+|[。！？]["\'»”)\]」』]*\s*')
+
+# Hiragana/katakana, CJK ideographs and Hangul carry roughly a word per character
+_WIDE_CHAR = re.compile(r'[぀-ヿ㐀-鿿가-힯豈-﫿]')
+WIDE_CHAR_WEIGHT = 3
+
+
+def text_weight(text: str) -> int:
+    """Length of text in Latin-character equivalents"""
+    wide = len(_WIDE_CHAR.findall(text))
+    return len(text) + (WIDE_CHAR_WEIGHT - 1) * wide
+
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Split text into sentences, merging fragments shorter than min_chars into the next one
+
+    Very short pieces ("Yes.", "Dr.") make choppy speech and waste provider
+    calls, so they are joined with their neighbour, keeping the original
+    spacing (none after CJK terminators). CJK characters count as
+    WIDE_CHAR_WEIGHT towards min_chars. Always returns at least one piece for
+    non-empty text.
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    pieces = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+
+    sentences = []
+    carry = ""
+    for piece in pieces:
+        carry += piece
+        if text_weight(carry.strip()) >= min_chars:
+            sentences.append(carry)
+            carry = ""
+    if carry.strip():
+        # Attach a short tail to the previous sentence rather than sending it alone
+        if sentences:
+            sentences[-1] += carry
+        else:
+            sentences.append(carry)
+    return [sentence.strip() for sentence in sentences]
@@ -7,10 +7,16 @@ class VoiceTranslator {
         this.isConnected = false;
         this.currentRoom = null;
         this.userLanguage = 'en';
+        this.deliveryMode = 'audio';
         this.audioContext = null;
         this.analyser = null;
         this.microphone = null;
         this.volumeUpdateInterval = null;
+        // Translations arrive in speaker order; play them one after another
+        this.playbackQueue = [];
+        this.currentAudio = null;
+        // Message bubbles still receiving sentence segments, by utterance id
+        this.segmentMessages = {};
         
         this.initializeElements();
         this.setupEventListeners();
@@ -23,6 +29,8 @@ class VoiceTranslator {
             controlSection: document.getElementById('controlSection'),
             roomId: document.getElementById('roomId'),
             userLanguage: document.getElementById('userLanguage'),
+            deliveryMode: document.getElementById('deliveryMode'),
+            activeDeliveryMode: document.getElementById('activeDeliveryMode'),
             serverUrl: document.getElementById('serverUrl'),
             connectBtn: document.getElementById('connectBtn'),
             disconnectBtn: document.getElementById('disconnectBtn'),
@@ -41,6 +49,9 @@ class VoiceTranslator {
     setupEventListeners() {
         this.elements.connectBtn.addEventListener('click', () => this.connectToRoom());
         this.elements.disconnectBtn.addEventListener('click', () => this.disconnect());
+        this.elements.activeDeliveryMode.addEventListener('change', () => {
+            this.setDeliveryMode(this.elements.activeDeliveryMode.value);
+        });
         
         // Mouse events for desktop
         this.elements.micButton.addEventListener('mousedown', () => this.startRecording());
@@ -123,6 +134,8 @@ class VoiceTranslator {
         }
         
         this.userLanguage = this.elements.userLanguage.value;
+        this.deliveryMode = this.elements.deliveryMode.value;
+        this.elements.activeDeliveryMode.value = this.deliveryMode;
         
         this.showLoading(true);
         this.hideError();
@@ -138,7 +151,9 @@ class VoiceTranslator {
                 console.log('Socket.IO connected to', serverUrl);
                 this.socket.emit('join_room', {
                     room_id: roomId,
-                    language: this.userLanguage
+                    language: this.userLanguage,
+                    codecs: this.getSupportedCodecs(),
+                    delivery: this.deliveryMode
                 });
             });
 
@@ -159,6 +174,26 @@ class VoiceTranslator {
         }
     }
     
+    setDeliveryMode(mode) {
+        this.deliveryMode = mode;
+        if (this.socket && this.isConnected) {
+            this.socket.emit('set_delivery_mode', { mode });
+        }
+    }
+    
+    getSupportedCodecs() {
+        // Advertise the output codecs this browser can play, most preferred first
+        const probe = document.createElement('audio');
+        const candidates = [
+            ['opus', 'audio/ogg; codecs="opus"'],
+            ['mp3', 'audio/mpeg'],
+            ['aac', 'audio/aac']
+        ];
+        return candidates
+            .filter(([, mime]) => probe.canPlayType(mime) !== '')
+            .map(([codec]) => codec);
+    }
+    
     setupSocketListeners() {
         this.socket.on('connected', (data) => {
             console.log('Connected to server:', data.message);
@@ -290,34 +325,81 @@ class VoiceTranslator {
             return;
         }
         
-        // Add message to conversation
-        this.addMessage('received', data.text, data.original_text);
-        // Play translated audio
-        this.playAudio(data.audio);
+        // Add message to conversation; later segments of an utterance extend its bubble
+        const pending = data.utterance_id ? this.segmentMessages[data.utterance_id] : null;
+        if (data.late) {
+            // Arrived after the server gave up waiting for it: show out of order, text only
+            const messageDiv = data.delivery === 'original'
+                ? this.addMessage('received', data.original_text)
+                : this.addMessage('received', data.text, data.original_text);
+            messageDiv.querySelector('.message-header').textContent += ' (late)';
+        } else if (pending && data.segment_index > 0) {
+            this.appendToMessage(pending, data.text, data.original_text);
+        } else if (data.delivery === 'original') {
+            this.addMessage('received', data.original_text);
+        } else {
+            const messageDiv = this.addMessage('received', data.text, data.original_text);
+            if (data.utterance_id && data.segment_count > 1) {
+                this.segmentMessages[data.utterance_id] = messageDiv;
+            }
+        }
+        if (data.utterance_id && data.final !== false) {
+            delete this.segmentMessages[data.utterance_id];
+        }
+        // Play translated audio (absent for text-only and late delivery)
+        if (data.audio && !data.late) {
+            this.playAudio(data.audio, data.mime);
+        }
     }
     
-    playAudio(base64Audio) {
+    playAudio(base64Audio, mimeType = 'audio/mpeg') {
         try {
-            console.log('Playing audio, base64 length:', base64Audio ? base64Audio.length : 0);
+            console.log('Queueing audio, base64 length:', base64Audio ? base64Audio.length : 0);
             const audioData = atob(base64Audio);
             const audioArray = new Uint8Array(audioData.length);
             for (let i = 0; i < audioData.length; i++) {
                 audioArray[i] = audioData.charCodeAt(i);
             }
-            const audioBlob = new Blob([audioArray], { type: 'audio/mpeg' });
-            const audioUrl = URL.createObjectURL(audioBlob);
-            const audio = new Audio(audioUrl);
-            audio.onended = () => {
-                URL.revokeObjectURL(audioUrl);
-            };
-            audio.play().catch(error => {
-                console.warn('Audio playback failed:', error);
-            });
+            const audioBlob = new Blob([audioArray], { type: mimeType || 'audio/mpeg' });
+            this.playbackQueue.push(URL.createObjectURL(audioBlob));
+            this.playNext();
         } catch (error) {
             console.error('Error playing audio:', error);
         }
     }
     
+    playNext() {
+        if (this.currentAudio || this.playbackQueue.length === 0) {
+            return;
+        }
+        const audioUrl = this.playbackQueue.shift();
+        const audio = new Audio(audioUrl);
+        this.currentAudio = audio;
+        const finish = () => {
+            if (this.currentAudio !== audio) {
+                return;
+            }
+            URL.revokeObjectURL(audioUrl);
+            this.currentAudio = null;
+            this.playNext();
+        };
+        audio.onended = finish;
+        audio.onerror = finish;
+        audio.play().catch(error => {
+            console.warn('Audio playback failed:', error);
+            finish();
+        });
+    }
+    
+    stopPlayback() {
+        if (this.currentAudio) {
+            this.currentAudio.pause();
+            this.currentAudio = null;
+        }
+        this.playbackQueue.forEach(url => URL.revokeObjectURL(url));
+        this.playbackQueue = [];
+    }
+    
     addMessage(type, text, originalText = null) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}`;
@@ -350,6 +432,16 @@ class VoiceTranslator {
         
         this.elements.conversation.appendChild(messageDiv);
         this.elements.conversation.scrollTop = this.elements.conversation.scrollHeight;
+        return messageDiv;
+    }
+    
+    appendToMessage(messageDiv, text, originalText = null) {
+        const textDiv = messageDiv.querySelector('.message-text');
+        textDiv.firstChild.nodeValue += ` ${text}`;
+        if (originalText && textDiv.lastChild !== textDiv.firstChild) {
+            textDiv.lastChild.textContent += ` ${originalText}`;
+        }
+        this.elements.conversation.scrollTop = this.elements.conversation.scrollHeight;
     }
     
     updateUsersList() {
@@ -362,6 +454,8 @@ class VoiceTranslator {
             this.socket.disconnect();
         }
         
+        this.stopPlayback();
+        this.segmentMessages = {};
         this.isConnected = false;
         this.currentRoom = null;
         this.showSetupSection();